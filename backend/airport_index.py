@@ -0,0 +1,163 @@
+"""In-memory prefix index for airport autocomplete
+
+The bundled data/airports.csv (IATA code, name, city, country; derived from
+the MIT-licensed airportsdata package, see data/airports.LICENSE) is loaded
+once into a sorted list of search terms. A lookup is a binary search for the
+query's range of terms instead of a scan of every airport, and one- and
+two-character prefixes (the ranges too large to rank per keystroke) are
+ranked ahead of time.
+"""
+import csv
+import os
+import unicodedata
+from bisect import bisect_left
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'airports.csv')
+
+MAX_SUGGESTIONS = 20
+
+# Ranking weight of the field a term came from (lower ranks first)
+CODE, CITY, NAME, COUNTRY = range(4)
+
+# Words that appear in so many names that they are useless as a match start
+STOP_WORDS = {'airport', 'international', 'regional', 'municipal', 'airfield', 'field',
+              'airstrip', 'aerodrome', 'county', 'the', 'of', 'de', 'del', 'da', 'do', 'la', 'el'}
+
+# Prefixes up to this length have their top suggestions precomputed
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+# Upper bound on terms examined for one uncomputed prefix
+MAX_SCAN = 2000
+
+# Fall back to typo-tolerant matching when exact prefixes find fewer airports
+TYPO_FALLBACK_BELOW = 3
+
+# Sorts after every normalized term that shares a prefix
+END = chr(0x10FFFF)
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c if c.isalnum() else ' ' for c in text if not unicodedata.combining(c))
+    return ' '.join(text.lower().split())
+
+class AirportIndex:
+    """Ranked, typo-tolerant prefix search over airports"""
+
+    def __init__(self, airports, featured=()):
+        self.airports = airports
+        # Featured airports (the ones we sell most) rank first, then international ones
+        featured = set(featured)
+        self._popularity = [2 if a['code'] in featured else 1 if 'international' in normalize(a['name']) else 0
+                            for a in airports]
+
+        terms = set()
+        for idx, airport in enumerate(airports):
+            terms.add((airport['code'].lower(), CODE, idx))
+            for field, value in ((CITY, airport['city']), (NAME, airport['name']),
+                                 (COUNTRY, airport['country'])):
+                words = normalize(value).split()
+                # Each word starts a term so 'kennedy' finds 'John F Kennedy ...'
+                for start, word in enumerate(words):
+                    if start == 0 or word not in STOP_WORDS:
+                        terms.add((' '.join(words[start:]), field, idx))
+
+        self._terms = sorted(terms)
+        self._keys = [term[0] for term in self._terms]
+
+        self._top = {}
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            for prefix in {key[:length] for key in self._keys if len(key) >= length}:
+                self._top[prefix] = self._rank(self._prefix_matches(prefix, limit=None), prefix,
+                                               MAX_SUGGESTIONS)
+
+    @classmethod
+    def from_csv(cls, path=DATA_PATH, featured=()):
+        """Load the index from a code,name,city,country CSV file"""
+        with open(path, newline='', encoding='utf-8') as f:
+            airports = [{'code': row['code'], 'name': row['name'], 'city': row['city'],
+                         'country': row['country']} for row in csv.DictReader(f)]
+        return cls(airports, featured)
+
+    def __len__(self):
+        return len(self.airports)
+
+    def _prefix_matches(self, prefix, limit=MAX_SCAN, typo=0):
+        """(term, field, idx, typo) for terms starting with prefix"""
+        matches = []
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix):
+            matches.append(self._terms[i] + (typo,))
+            i += 1
+            if limit and len(matches) >= limit:
+                break
+        return matches
+
+    def _typo_matches(self, query):
+        """Terms starting with a one-edit variant of the query
+
+        Edits (deletion, transposition, substitution, insertion) are only
+        tried after prefixes of the query that exist in the index, and only
+        with characters that actually follow that prefix, so a misspelling
+        costs a few hundred bisects rather than a scan of every term.
+        """
+        keys = self._keys
+        variants = set()
+        for p in range(len(query)):
+            head = query[:p]
+            lo = bisect_left(keys, head)
+            hi = bisect_left(keys, head + END)
+            if lo == hi:
+                break
+            variants.add(head + query[p + 1:])
+            if p + 1 < len(query):
+                variants.add(head + query[p + 1] + query[p] + query[p + 2:])
+            i = lo
+            while i < hi:
+                if len(keys[i]) <= p:
+                    i += 1
+                    continue
+                c = keys[i][p]
+                variants.add(head + c + query[p + 1:])
+                variants.add(head + c + query[p:])
+                i = bisect_left(keys, head + chr(ord(c) + 1), i, hi)
+
+        variants.discard(query)
+        matches = []
+        for variant in variants:
+            if len(variant) >= 3:
+                matches.extend(self._prefix_matches(variant, typo=1))
+        return matches
+
+    def _rank(self, matches, query, limit):
+        """Best match per airport
+
+        Order: exact code, then no-typo before typo, popularity, field
+        (code, city, name, country), exact term, code.
+        """
+        best = {}
+        for term, field, idx, typo in matches:
+            exact_code = field == CODE and term == query
+            score = (not exact_code, typo, -self._popularity[idx], field, term != query,
+                     self.airports[idx]['code'])
+            if idx not in best or score < best[idx]:
+                best[idx] = score
+        ranked = sorted(best, key=best.get)
+        return ranked[:limit]
+
+    def suggest(self, query, limit=10):
+        """Up to limit airports matching a prefix of code, city, name or country"""
+        query = normalize(query)
+        if not query:
+            return []
+        limit = min(limit, MAX_SUGGESTIONS)
+
+        if query in self._top:
+            ranked = self._top[query][:limit]
+        else:
+            matches = self._prefix_matches(query)
+            if len({idx for _, _, idx, _ in matches}) < TYPO_FALLBACK_BELOW and len(query) >= 3:
+                matches.extend(self._typo_matches(query))
+            ranked = self._rank(matches, query, limit)
+
+        return [self.airports[idx] for idx in ranked]
@@ -0,0 +1,233 @@
+"""Amadeus Self-Service flight offers supplier client
+
+AmadeusClient is fully async: one pooled keep-alive aiohttp session, an
+OAuth client-credentials token cached until shortly before it expires, and
+concurrent fan-out of route/date queries. AmadeusService runs that client on
+a dedicated event loop thread so synchronous Flask views can call it while
+reusing the same connections and token across requests.
+"""
+import asyncio
+import concurrent.futures
+import re
+import threading
+import time
+
+try:
+    import aiohttp
+except ImportError:  # optional dependency, only needed when FLIGHT_SUPPLIER = 'amadeus'
+    aiohttp = None
+
+TRAVEL_CLASSES = {'economy': 'ECONOMY', 'business': 'BUSINESS', 'first': 'FIRST'}
+
+# Refresh tokens this many seconds before Amadeus says they expire
+TOKEN_EXPIRY_MARGIN = 30
+
+_DURATION = re.compile(r'PT(?:(\d+)H)?(?:(\d+)M)?')
+
+class SupplierError(Exception):
+    """The flight supplier could not be reached or returned an error"""
+
+def format_duration(iso_duration):
+    """Convert an ISO 8601 duration such as 'PT4H15M' to '4h 15m'"""
+    match = _DURATION.fullmatch(iso_duration or '')
+    if not match:
+        return iso_duration
+    return f"{int(match.group(1) or 0)}h {int(match.group(2) or 0)}m"
+
+def offer_to_flight(offer, carriers, class_type='economy'):
+    """Convert an Amadeus flight offer to the search result format"""
+    itinerary = offer['itineraries'][0]
+    segments = itinerary['segments']
+    first, last = segments[0], segments[-1]
+    carrier = first['carrierCode']
+
+    return {
+        'id': f"{carrier}{first['number']}",
+        'offer_id': offer['id'],
+        'airline': carriers.get(carrier, carrier),
+        'airline_code': carrier,
+        'rating': None,
+        'origin': first['departure']['iataCode'],
+        'destination': last['arrival']['iataCode'],
+        'departure_time': first['departure']['at'][11:16],
+        'arrival_time': last['arrival']['at'][11:16],
+        'date': first['departure']['at'][:10],
+        'duration': format_duration(itinerary.get('duration')),
+        'price': round(float(offer['price'].get('grandTotal') or offer['price']['total']), 2),
+        'currency': offer['price'].get('currency'),
+        'stops': len(segments) - 1,
+        'seats_available': offer.get('numberOfBookableSeats'),
+        'aircraft': first.get('aircraft', {}).get('code'),
+        'class': class_type,
+        'source': 'amadeus'
+    }
+
+class AmadeusClient:
+    """Async Amadeus client sharing one pooled session and OAuth token"""
+
+    def __init__(self, api_key, api_secret, base_url='https://test.api.amadeus.com',
+                 pool_size=20, timeout=10):
+        if aiohttp is None:
+            raise RuntimeError('aiohttp is required for the Amadeus supplier (pip install aiohttp)')
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._token = None
+        self._token_expires_at = 0
+        self._token_lock = None
+        self.token_fetches = 0
+        self.requests = 0
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def _get_token(self, force=False):
+        """Return a valid access token, fetching one only when needed"""
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            if not force and self._token and time.monotonic() < self._token_expires_at:
+                return self._token
+
+            async with self._get_session().post(
+                f'{self.base_url}/v1/security/oauth2/token',
+                data={
+                    'grant_type': 'client_credentials',
+                    'client_id': self.api_key,
+                    'client_secret': self.api_secret
+                }
+            ) as response:
+                if response.status != 200:
+                    raise SupplierError(f'Token request failed with status {response.status}')
+                data = await response.json()
+
+            self.token_fetches += 1
+            self._token = data['access_token']
+            self._token_expires_at = time.monotonic() + int(data.get('expires_in', 1799)) - TOKEN_EXPIRY_MARGIN
+            return self._token
+
+    async def flight_offers(self, origin, destination, departure_date, adults=1,
+                            class_type='economy', non_stop=False, max_price=None, max_results=20):
+        """Fetch flight offers for one route and date as search results"""
+        params = {
+            'originLocationCode': origin,
+            'destinationLocationCode': destination,
+            'departureDate': str(departure_date),
+            'adults': adults,
+            'travelClass': TRAVEL_CLASSES.get(class_type, 'ECONOMY'),
+            'max': max_results
+        }
+        if non_stop:
+            params['nonStop'] = 'true'
+        if max_price is not None:
+            params['maxPrice'] = int(max_price)
+
+        for attempt in range(2):
+            try:
+                token = await self._get_token(force=attempt > 0)
+                self.requests += 1
+                async with self._get_session().get(
+                    f'{self.base_url}/v2/shopping/flight-offers',
+                    params=params,
+                    headers={'Authorization': f'Bearer {token}'}
+                ) as response:
+                    if response.status == 401 and attempt == 0:
+                        continue  # token revoked early; fetch a new one and retry once
+                    if response.status != 200:
+                        raise SupplierError(f'Flight offers request failed with status {response.status}')
+                    data = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise SupplierError(str(e)) from e
+
+            carriers = data.get('dictionaries', {}).get('carriers', {})
+            return [offer_to_flight(offer, carriers, class_type) for offer in data.get('data', [])]
+
+        raise SupplierError('Flight offers request was not authorized')
+
+    async def search_many(self, queries, **options):
+        """Run (origin, destination, date) queries concurrently
+
+        Returns results in query order; a failed query yields its exception.
+        """
+        return await asyncio.gather(
+            *(self.flight_offers(origin, destination, departure_date, **options)
+              for origin, destination, departure_date in queries),
+            return_exceptions=True
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+class AmadeusService:
+    """Runs an AmadeusClient on a background event loop for sync callers"""
+
+    def __init__(self, client):
+        self.client = client
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='amadeus-loop',
+                                 daemon=True).start()
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the supplier loop and wait for its result"""
+        timeout = timeout or self.client.timeout * 2
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # Stop the coroutine too, rather than leave it running on the loop
+            future.cancel()
+            raise SupplierError(f'Supplier did not answer within {timeout:g}s') from None
+
+    def search(self, origin, destination, dates, **options):
+        """Fetch offers for a route over several dates concurrently, merged"""
+        results = self.run(self.client.search_many(
+            [(origin, destination, departure_date) for departure_date in dates], **options))
+
+        flights = []
+        for result in results:
+            if isinstance(result, Exception):
+                raise SupplierError(str(result)) from result
+            flights.extend(result)
+        return flights
+
+    def stats(self):
+        return {
+            'token_fetches': self.client.token_fetches,
+            'requests': self.client.requests,
+            'pool_size': self.client.pool_size
+        }
+
+    def close(self):
+        if self._loop is not None:
+            self.run(self.client.close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+def create_supplier(config):
+    """Build the Amadeus service when FLIGHT_SUPPLIER is 'amadeus', else None"""
+    if config.get('FLIGHT_SUPPLIER') != 'amadeus':
+        return None
+    if not config.get('AMADEUS_API_KEY') or not config.get('AMADEUS_API_SECRET'):
+        raise RuntimeError('FLIGHT_SUPPLIER is amadeus but AMADEUS_API_KEY/AMADEUS_API_SECRET are not set')
+    return AmadeusService(AmadeusClient(
+        config['AMADEUS_API_KEY'],
+        config['AMADEUS_API_SECRET'],
+        base_url=config.get('AMADEUS_BASE_URL', 'https://test.api.amadeus.com'),
+        pool_size=config.get('AMADEUS_POOL_SIZE', 20),
+        timeout=config.get('AMADEUS_TIMEOUT', 10)
+    ))
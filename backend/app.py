@@ -1,8 +1,22 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
 from models import db
+from database import apply_sqlite_pragmas, engine_options, pool_stats
+from migrations import ensure_columns, missing_indexes
+from cache import BackgroundRefresher, SearchResultCache, SingleFlight, create_cache_backend
+from amadeus import create_supplier
+from serializers import create_json_provider
+from identifiers import IdentifierGenerator
+from holds import HoldSweeper
+from idempotency import IdempotencyStore, create_idempotency_backend
+from user_cache import UserCache
+from revocation import RevocationList
+from passwords import HasherBusy, PasswordHasher
+from ratelimit import RateLimiter, create_bucket_store, enforce_rate_limits
+from internal import internal_only
 import os
 
 def create_app(config_name='development'):
@@ -12,14 +26,93 @@ def create_app(config_name='development'):
     # Load configuration
     app.config.from_object(config[config_name])
     
+    # Pool sizing from the config class; options set explicitly win
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **engine_options(app.config),
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    }
+    
     # Initialize extensions
     db.init_app(app)
     CORS(app)
     jwt = JWTManager(app)
+    json_provider = create_json_provider(app)
+    if json_provider:
+        app.json = json_provider
+    app.extensions['cache'] = create_cache_backend(app.config)
+    app.extensions['search_cache'] = SearchResultCache(
+        app.extensions['cache'],
+        ttl=app.config['SEARCH_CACHE_TTL']
+    )
+    app.extensions['search_singleflight'] = SingleFlight()
+    app.extensions['search_refresher'] = BackgroundRefresher(workers=app.config['SEARCH_REFRESH_WORKERS'])
+    app.extensions['supplier'] = create_supplier(app.config)
+    app.extensions['idempotency'] = IdempotencyStore(
+        create_idempotency_backend(app.config, app.extensions['cache']),
+        ttl=app.config['IDEMPOTENCY_TTL'],
+        lock_ttl=app.config['IDEMPOTENCY_LOCK_TTL']
+    )
+    app.extensions['booking_references'] = IdentifierGenerator('booking_reference', 'BK', app.config['ID_BLOCK_SIZE'])
+    app.extensions['ticket_numbers'] = IdentifierGenerator('ticket_number', 'TKT', app.config['ID_BLOCK_SIZE'])
+    
+    # Logged-out tokens are refused (checked in memory, see revocation.py)
+    app.extensions['revoked_tokens'] = RevocationList(sync_interval=app.config['REVOCATION_SYNC_SECONDS'])
+    
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_data):
+        return app.extensions['revoked_tokens'].is_revoked(jwt_data['jti'])
+    
+    @jwt.revoked_token_loader
+    def revoked_token_response(jwt_header, jwt_data):
+        return jsonify({'error': 'Token has been revoked'}), 401
+    
+    # Password hashes run on a bounded pool that sheds load with 503
+    app.extensions['password_hasher'] = PasswordHasher(
+        method=app.config['PASSWORD_HASH_METHOD'],
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_queue=app.config['PASSWORD_HASH_QUEUE'],
+        executor=app.config['PASSWORD_HASH_EXECUTOR'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT']
+    )
+    
+    # Protected routes confirm the token's user from a short-lived cache
+    app.extensions['user_cache'] = UserCache(ttl=app.config['USER_CACHE_TTL'],
+                                             maxsize=app.config['USER_CACHE_MAX_ENTRIES'])
+    
+    @jwt.user_lookup_loader
+    def load_user(jwt_header, jwt_data):
+        return app.extensions['user_cache'].get(jwt_data[app.config['JWT_IDENTITY_CLAIM']])
+    
+    @jwt.user_lookup_error_loader
+    def user_not_found(jwt_header, jwt_data):
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Rate limit public endpoints per client IP
+    app.extensions['rate_limiter'] = RateLimiter(
+        create_bucket_store(app.config, app.extensions['cache']),
+        app.config['RATE_LIMITS']
+    )
+    if app.config['RATELIMIT_ENABLED']:
+        app.before_request(enforce_rate_limits)
+    if app.config['RATELIMIT_TRUSTED_PROXIES']:
+        proxies = app.config['RATELIMIT_TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
     
     # Create database tables
     with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config)
         db.create_all()
+        ensure_columns()
+        missing = missing_indexes()
+        if missing:
+            app.logger.warning('Database is missing indexes %s; run `flask --app app create-indexes`',
+                               ', '.join(index.name for index in missing))
+    
+    # Give the seats of expired holds back
+    app.extensions['hold_sweeper'] = HoldSweeper(app, interval=app.config['HOLD_SWEEP_INTERVAL'],
+                                                 batch_size=app.config['HOLD_SWEEP_BATCH'])
+    if app.config['HOLD_SWEEP_INTERVAL'] > 0:
+        app.extensions['hold_sweeper'].start()
     
     # Register blueprints
     from routes.auth import auth_bp
@@ -36,11 +129,23 @@ def create_app(config_name='development'):
     app.register_blueprint(profile_bp, url_prefix='/api/profile')
     app.register_blueprint(enquiry_bp, url_prefix='/api/enquiry')
     
+    # CLI commands
+    from commands import register_commands
+    register_commands(app)
+    
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({'error': 'Resource not found'}), 404
     
+    @app.errorhandler(HasherBusy)
+    def hasher_busy(error):
+        db.session.rollback()
+        response = jsonify({'error': 'Server busy, please try again shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    
     @app.errorhandler(500)
     def internal_error(error):
         db.session.rollback()
@@ -54,6 +159,12 @@ def create_app(config_name='development'):
             'message': 'AeroBook API is running'
         })
     
+    # Connection pool occupancy and checkout waits for this worker
+    @app.route('/api/health/db')
+    @internal_only
+    def database_health():
+        return jsonify(pool_stats(db.engine))
+    
     # Root endpoint
     @app.route('/')
     def index():
@@ -0,0 +1,37 @@
+"""ASGI entry point: serve the Flask app with an ASGI server
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 4
+
+The server's event loop owns the sockets, so thousands of open or slow
+keep-alive connections cost no threads. Flask itself stays a WSGI app behind
+asgiref's WsgiToAsgi, and views run synchronously, the same as under
+gunicorn's gthread workers. The config comes from APP_CONFIG (default
+'production').
+
+On its own, WsgiToAsgi runs every request on one shared thread. Each request
+here gets a ThreadSensitiveContext instead, which gives it a thread of its
+own, and at most ASGI_THREADS (default 8) run at once per worker.
+"""
+import asyncio
+import os
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+
+class BoundedWsgiToAsgi:
+    """WsgiToAsgi with each request on its own thread, `threads` at a time"""
+
+    def __init__(self, wsgi_application, threads=8):
+        self.application = WsgiToAsgi(wsgi_application)
+        self.threads = threads
+        self._slots = asyncio.Semaphore(threads)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+        async with self._slots:
+            async with ThreadSensitiveContext():
+                await self.application(scope, receive, send)
+
+flask_app = create_app(os.environ.get('APP_CONFIG', 'production'))
+app = BoundedWsgiToAsgi(flask_app, threads=int(os.environ.get('ASGI_THREADS', 8)))
@@ -0,0 +1,741 @@
+"""Caches for hot read paths
+
+TTLCache is a plain in-process LRU+TTL cache. The CacheBackend classes put a
+common interface over where cached data lives, so the same code can cache per
+process (MemoryCache), per host across worker processes (SQLiteCache) or
+across hosts (RedisCache, any server speaking the Redis protocol). The
+backend is picked by Config.CACHE_BACKEND and created in create_app().
+"""
+import json
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL
+
+    Bounded by maxsize (least recently used entries are evicted first) and
+    ttl seconds. With maxsize=None nothing is evicted early: entries live out
+    their TTL, and expired ones are swept whenever the cache has doubled in
+    size since the last sweep. Keeps hit/miss/eviction counters for stats().
+    """
+
+    MIN_SWEEP_SIZE = 1024
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._sweep_at = self.MIN_SWEEP_SIZE
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting least recently used entries when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            self._trim()
+
+    def add(self, key, value, ttl=None):
+        """Store a value only if key is missing or expired; True if stored"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                return False
+            self._data[key] = (now + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            self._trim()
+            return True
+
+    def _trim(self):
+        # Called with the lock held
+        if self.maxsize is None:
+            if len(self._data) > self._sweep_at:
+                now = time.monotonic()
+                for key in [key for key, entry in self._data.items() if entry[0] <= now]:
+                    del self._data[key]
+                    self.expirations += 1
+                self._sweep_at = max(self.MIN_SWEEP_SIZE, 2 * len(self._data))
+            return
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key):
+        """Remove a key if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Counters and occupancy for instrumentation"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+class CacheBackend:
+    """Common interface for cache backends
+
+    Keys are strings. Values must be JSON-serializable (shared backends store
+    them encoded). Counters (incr/get_counters) live apart from cached values
+    and are never evicted by the cache itself.
+    """
+
+    name = 'base'
+
+    def __init__(self, default_ttl=300):
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value or None"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """Store a value for ttl seconds (default_ttl if None)"""
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        """Atomically store a value only if key is unset; True if stored"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove a key if present"""
+        raise NotImplementedError
+
+    def incr(self, key):
+        """Atomically increment a counter and return its new value"""
+        raise NotImplementedError
+
+    def get_counters(self, keys):
+        """Current values of several counters (0 when unset)"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drop all cached values"""
+        raise NotImplementedError
+
+    def get_or_set(self, key, builder, ttl=None):
+        """Return the cached value, building and caching it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = builder()
+            self.set(key, value, ttl)
+        return value
+
+    def _record(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self):
+        """Hit/miss counters for this process"""
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+class MemoryCache(CacheBackend):
+    """Per-process backend on top of TTLCache (values are not copied)
+
+    Counters are kept to maxsize as well, least recently used first. An
+    evicted counter must never come back at a value it already had, or keys
+    built from it (search versions) could match stale entries again. So
+    new counters start from one past the highest value ever evicted.
+    """
+
+    name = 'memory'
+
+    def __init__(self, maxsize=4096, default_ttl=300):
+        super().__init__(default_ttl)
+        self.maxsize = maxsize
+        self._cache = TTLCache(maxsize=maxsize, ttl=default_ttl)
+        self._counters = OrderedDict()
+        self._counter_floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._cache.set(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        return self._cache.add(key, value, ttl)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, self._counter_floor) + 1
+            self._counters[key] = value
+            self._counters.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._counters) > self.maxsize:
+                    _, evicted = self._counters.popitem(last=False)
+                    self._counter_floor = max(self._counter_floor, evicted + 1)
+            return value
+
+    def get_counters(self, keys):
+        with self._lock:
+            values = []
+            for key in keys:
+                if key in self._counters:
+                    self._counters.move_to_end(key)
+                values.append(self._counters.get(key, self._counter_floor))
+            return values
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats['backend'] = self.name
+        stats['counters'] = len(self._counters)
+        return stats
+
+class SQLiteCache(CacheBackend):
+    """Backend in a SQLite file shared by every worker process on one host
+
+    Uses WAL so readers never block on writers. Each thread gets its own
+    connection. Size is bounded approximately: every PRUNE_EVERY writes,
+    expired rows are deleted and the soonest-expiring rows beyond maxsize
+    are dropped (maxsize=None keeps every row until it expires). Entries go
+    in the table named by table, so several caches can share one file
+    without pruning each other's rows.
+    """
+
+    name = 'sqlite'
+    PRUNE_EVERY = 256
+
+    def __init__(self, path, maxsize=20000, default_ttl=300, table='cache_entries'):
+        super().__init__(default_ttl)
+        self.path = path
+        self.maxsize = maxsize
+        self.table = table
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        with conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {table} '
+                         '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS ix_{table}_expires_at ON {table} (expires_at)')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_counters '
+                         '(key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            f'SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return self._record(json.loads(row[0]) if row else None)
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        self._conn().execute(
+            f'INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value, separators=(',', ':')), expires_at)
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        # An expired row does not count as set; the upsert replaces it
+        added = self._conn().execute(
+            f'INSERT INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at '
+            f'WHERE {self.table}.expires_at <= ?',
+            (key, json.dumps(value, separators=(',', ':')), expires_at, now)
+        ).rowcount == 1
+        if added:
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self.prune()
+        return added
+
+    def delete(self, key):
+        self._conn().execute(f'DELETE FROM {self.table} WHERE key = ?', (key,))
+
+    def incr(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute('INSERT INTO cache_counters (key, value) VALUES (?, 1) '
+                         'ON CONFLICT(key) DO UPDATE SET value = value + 1', (key,))
+            return conn.execute('SELECT value FROM cache_counters WHERE key = ?', (key,)).fetchone()[0]
+
+    def get_counters(self, keys):
+        if not keys:
+            return []
+        placeholders = ','.join('?' * len(keys))
+        values = dict(self._conn().execute(
+            f'SELECT key, value FROM cache_counters WHERE key IN ({placeholders})', list(keys)
+        ).fetchall())
+        return [values.get(key, 0) for key in keys]
+
+    def clear(self):
+        self._conn().execute(f'DELETE FROM {self.table}')
+
+    def prune(self):
+        """Delete expired rows and trim the table to maxsize"""
+        conn = self._conn()
+        with conn:
+            conn.execute(f'DELETE FROM {self.table} WHERE expires_at <= ?', (time.time(),))
+            if self.maxsize is not None:
+                conn.execute(f'DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} '
+                             'ORDER BY expires_at DESC LIMIT -1 OFFSET ?)', (self.maxsize,))
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({
+            'path': self.path,
+            'maxsize': self.maxsize,
+            'size': self._conn().execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        })
+        return stats
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+class RedisConnection:
+    """A single RESP2 connection (no external client library needed)"""
+
+    def __init__(self, host, port, db=0, password=None, timeout=2.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.execute('AUTH', password)
+        if db:
+            self.execute('SELECT', db)
+
+    def execute(self, *args):
+        """Send one command and return its decoded reply"""
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by server')
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode()
+        if kind == b'-':
+            raise RedisError(body.decode())
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length == -1:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(body)
+            if length == -1:
+                return None
+            # Read every element, even after an error one, so the next
+            # reply starts where it should
+            items, error = [], None
+            for _ in range(length):
+                try:
+                    items.append(self._read_reply())
+                except RedisError as e:
+                    error = error or e
+            if error:
+                raise error
+            return items
+        raise ConnectionError(f'Unexpected reply: {line!r}')
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+class RedisCache(CacheBackend):
+    """Backend on a Redis-protocol server, shared by workers on every host
+
+    Keeps a small pool of keep-alive connections. After an error reply the
+    connection is still in step and goes back to the pool; one that fails
+    any other way mid-command is closed.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url, default_ttl=300, key_prefix='aerobook:', pool_size=8):
+        super().__init__(default_ttl)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self.key_prefix = key_prefix
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _execute(self, *args):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = RedisConnection(self.host, self.port, self.db, self.password)
+        try:
+            reply = conn.execute(*args)
+        except RedisError:
+            self._release(conn)
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn)
+        return reply
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def get(self, key):
+        raw = self._execute('GET', self.key_prefix + key)
+        return self._record(json.loads(raw) if raw is not None else None)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        payload = json.dumps(value, separators=(',', ':'))
+        self._execute('SET', self.key_prefix + key, payload, 'PX', max(1, int(ttl * 1000)))
+
+    def add(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        payload = json.dumps(value, separators=(',', ':'))
+        return self._execute('SET', self.key_prefix + key, payload, 'PX', max(1, int(ttl * 1000)), 'NX') == 'OK'
+
+    def delete(self, key):
+        self._execute('DEL', self.key_prefix + key)
+
+    def incr(self, key):
+        return self._execute('INCR', self.key_prefix + 'counter:' + key)
+
+    def get_counters(self, keys):
+        if not keys:
+            return []
+        values = self._execute('MGET', *[self.key_prefix + 'counter:' + key for key in keys])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def clear(self):
+        cursor = b'0'
+        pattern = self.key_prefix + '*'
+        while True:
+            cursor, keys = self._execute('SCAN', cursor, 'MATCH', pattern, 'COUNT', 500)
+            keys = [key for key in keys if not key.startswith((self.key_prefix + 'counter:').encode())]
+            if keys:
+                self._execute('DEL', *keys)
+            if cursor in (b'0', 0):
+                break
+
+    def stats(self):
+        stats = super().stats()
+        stats['server'] = f'{self.host}:{self.port}/{self.db}'
+        return stats
+
+def create_cache_backend(config):
+    """Build the cache backend selected by CACHE_BACKEND in a config mapping"""
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = config.get('CACHE_DEFAULT_TTL', 300)
+
+    if backend == 'memory':
+        return MemoryCache(maxsize=config.get('CACHE_MAX_ENTRIES', 4096), default_ttl=ttl)
+    if backend == 'sqlite':
+        path = config.get('CACHE_URL') or os.path.join(os.getcwd(), 'aerobook_cache.db')
+        return SQLiteCache(path, maxsize=config.get('CACHE_MAX_ENTRIES', 20000), default_ttl=ttl)
+    if backend == 'redis':
+        return RedisCache(config.get('CACHE_URL') or 'redis://localhost:6379/0', default_ttl=ttl,
+                          key_prefix=config.get('CACHE_KEY_PREFIX', 'aerobook:'))
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+
+class SearchResultCache:
+    """Flight search results keyed on normalized search parameters
+
+    Every key embeds a version number for each (origin, destination, date)
+    the search covers. Changing seat inventory on a route/date bumps its
+    version via invalidate(), so every cached search touching that date
+    misses from then on and the stale entries age out of the backend.
+    Versions are backend counters, so with a shared backend an invalidation
+    in one worker is seen by all of them. Entries record when they were
+    stored (wall clock, so ages agree across processes).
+
+    Callers take key() once, before running the search, and store the
+    result under that same key. A result computed while a booking commits
+    then lands under the old version, where nobody reads it, rather than
+    under the new one.
+
+    The cache is an optimisation, so backend errors are logged and count as
+    a miss (get) or do nothing (set, invalidate); searches keep working
+    while the backend is down.
+    """
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self.invalidations = 0
+        self.errors = 0
+
+    def _failed(self, action, error):
+        self.errors += 1
+        logger.warning('Search cache %s failed (%s backend): %r', action, self.backend.name, error)
+
+    @staticmethod
+    def _version_key(origin, destination, departure_date):
+        return f'search-version:{origin}:{destination}:{departure_date}'
+
+    def key(self, params, dates):
+        """Cache key for a parameter tuple (origin, destination, ...) spanning dates
+
+        Embeds the current route/date versions. None if the backend is down,
+        which get() and set() treat as a miss and a no-op.
+        """
+        origin, destination = params[0], params[1]
+        try:
+            versions = self.backend.get_counters(
+                [self._version_key(origin, destination, d) for d in dates])
+        except Exception as e:
+            self._failed('key', e)
+            return None
+        return 'search:' + ':'.join(str(p) for p in params) + ':v' + '.'.join(map(str, versions))
+
+    def get(self, key):
+        """Cached (result, age in seconds) under key, or None"""
+        if key is None:
+            return None
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            self._failed('get', e)
+            return None
+        if entry is None:
+            return None
+        return entry['result'], max(0.0, time.time() - entry['stored_at'])
+
+    def set(self, key, result, ttl=None):
+        """Cache a result under the key taken before it was computed"""
+        if key is None:
+            return
+        entry = {'stored_at': time.time(), 'result': result}
+        try:
+            self.backend.set(key, entry, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            self._failed('set', e)
+
+    def invalidate(self, origin, destination, departure_date):
+        """Expire every cached search covering this route and date"""
+        try:
+            self.backend.incr(self._version_key(origin, destination, departure_date))
+        except Exception as e:
+            self._failed('invalidate', e)
+            return
+        self.invalidations += 1
+
+    def stats(self):
+        """Backend counters plus invalidations made by this process"""
+        try:
+            stats = self.backend.stats()
+        except Exception as e:
+            stats = {'backend': self.backend.name, 'error': repr(e)}
+        stats['ttl'] = self.ttl
+        stats['invalidations'] = self.invalidations
+        stats['errors'] = self.errors
+        return stats
+
+class _Call:
+    """An in-flight SingleFlight execution"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and share its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Return fn(), sharing one execution among concurrent callers of key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Executions, coalesced callers and calls currently in flight"""
+        with self._lock:
+            calls = self.executions + self.coalesced
+            return {
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'coalesced_rate': round(self.coalesced / calls, 4) if calls else 0.0,
+                'in_flight': len(self._calls)
+            }
+
+class BackgroundRefresher:
+    """Bounded worker pool for refreshing cache entries off the request path
+
+    A key already queued or running is not scheduled again, and when
+    max_pending refreshes are outstanding new ones are dropped (the stale
+    entry keeps being served until it expires).
+    """
+
+    def __init__(self, workers=4, max_pending=256):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cache-refresh')
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.scheduled = 0
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def refresh(self, key, fn):
+        """Run fn() in the background unless key is already being refreshed"""
+        with self._lock:
+            if key in self._pending:
+                self.skipped += 1
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.add(key)
+            self.scheduled += 1
+        self._executor.submit(self._run, key, fn)
+        return True
+
+    def _run(self, key, fn):
+        try:
+            fn()
+        except Exception:
+            logger.exception('Background refresh failed for %r', key)
+            with self._lock:
+                self.failed += 1
+        else:
+            with self._lock:
+                self.completed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self):
+        """Refresh counters and current queue depth"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'pending': len(self._pending),
+                'scheduled': self.scheduled,
+                'completed': self.completed,
+                'failed': self.failed,
+                'skipped': self.skipped,
+                'dropped': self.dropped
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,58 @@
+"""Flask CLI commands (run with `flask --app app <command>` from backend/)"""
+import click
+from models import db, Booking, Flight, FlightInstance, SeatHold
+from inventory import seed_flights, import_flights_csv
+from migrations import ensure_indexes
+
+def register_commands(app):
+    """Register CLI commands on the app"""
+
+    @app.cli.command('seed-flights')
+    @click.option('--days', default=30, show_default=True, help='Number of days of departures to generate')
+    @click.option('--per-route', default=8, show_default=True, help='Scheduled flights per route')
+    @click.option('--seed', default=42, show_default=True, help='Random seed (same seed, same schedule)')
+    @click.option('--reset', is_flag=True, help='Delete the existing schedule first')
+    @click.option('--detach-bookings', is_flag=True,
+                  help='With --reset, unlink bookings from the deleted flights instead of refusing')
+    def seed_flights_command(days, per_route, seed, reset, detach_bookings):
+        """Seed the flight inventory with a generated schedule"""
+        if reset:
+            # Bookings and holds point at the flight instances being deleted
+            linked = Booking.query.filter(Booking.flight_instance_id.isnot(None)).count()
+            if linked and not detach_bookings:
+                raise click.ClickException(
+                    f'{linked} bookings reference the current schedule; '
+                    'rerun with --detach-bookings to unlink them and reset anyway')
+            # Detached bookings keep their copied flight details but no
+            # longer take or give back seats
+            Booking.query.filter(Booking.flight_instance_id.isnot(None)).update(
+                {'flight_instance_id': None}, synchronize_session=False)
+            SeatHold.query.delete()
+            FlightInstance.query.delete()
+            Flight.query.delete()
+            db.session.commit()
+        elif Flight.query.first():
+            click.echo('Flight inventory already seeded (use --reset to regenerate)')
+            return
+
+        flights, instances = seed_flights(days=days, flights_per_route=per_route, seed=seed)
+        click.echo(f'Seeded {flights} flights and {instances} flight instances')
+
+    @app.cli.command('import-flights')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    def import_flights_command(path):
+        """Bulk import flight instances from a CSV file"""
+        try:
+            flights, instances = import_flights_csv(path)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'Imported {flights} new flights and {instances} flight instances')
+
+    @app.cli.command('create-indexes')
+    def create_indexes_command():
+        """Create indexes declared on the models that the database is missing"""
+        created = ensure_indexes()
+        if created:
+            click.echo(f"Created {len(created)} indexes: {', '.join(created)}")
+        else:
+            click.echo('All indexes already exist')
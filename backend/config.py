@@ -7,6 +7,25 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///aerobook.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool per worker process (see database.py): connections kept
+    # open, extra ones allowed under load, seconds a request waits for one
+    # before failing, and seconds before a server connection is replaced.
+    # Cover the server's threads per worker plus the background workers that
+    # query (search refresh, hold sweeper); /api/health/db shows the waits
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = 1800
+    DB_POOL_PRE_PING = True
+    
+    # SQLite pragmas set on each connection: WAL lets reads run alongside the
+    # writer, synchronous=NORMAL skips an fsync per commit (safe in WAL short
+    # of losing the last commits on power loss), and a writer waits
+    # SQLITE_BUSY_TIMEOUT ms for the lock instead of failing at once
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT = 5000
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-aerobook'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
@@ -14,17 +33,112 @@ class Config:
     # API Keys
     AMADEUS_API_KEY = os.environ.get('AMADEUS_API_KEY') or ''
     AMADEUS_API_SECRET = os.environ.get('AMADEUS_API_SECRET') or ''
+    AMADEUS_BASE_URL = os.environ.get('AMADEUS_BASE_URL') or 'https://test.api.amadeus.com'
+    AMADEUS_POOL_SIZE = 20
+    AMADEUS_TIMEOUT = 10
+    
+    # Flight search source: 'inventory' (local database) or 'amadeus'
+    FLIGHT_SUPPLIER = os.environ.get('FLIGHT_SUPPLIER') or 'inventory'
     
     # CORS
     CORS_HEADERS = 'Content-Type'
     
     # Pagination
     ITEMS_PER_PAGE = 20
+    
+    # Booking references / ticket numbers reserved per database round trip
+    ID_BLOCK_SIZE = 100
+    
+    # Seconds before a logout in one worker is seen by the others
+    REVOCATION_SYNC_SECONDS = int(os.environ.get('REVOCATION_SYNC_SECONDS', 5))
+    
+    # Password hashing: Werkzeug method (stored hashes using another one are
+    # upgraded at login), executor ('thread' or 'process') and its size,
+    # and how many more hashes may wait before requests get 503. Keep
+    # workers + queue well below the server's threads per worker so a login
+    # storm cannot occupy them all. PASSWORD_HASH_WORKERS=0 hashes on the
+    # request thread
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR') or 'thread'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 2))
+    PASSWORD_HASH_TIMEOUT = 10
+    
+    # Process-wide user snapshots behind JWT verification (seconds, 0 turns
+    # the cache off)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+    USER_CACHE_MAX_ENTRIES = 10000
+    
+    # Token-bucket limits per client IP on unauthenticated endpoints, keyed
+    # by endpoint name: 'N/second|minute|hour' allows bursts of N refilled
+    # over the period. RATELIMIT_STORAGE is 'memory' (per process) or
+    # 'shared' (the sqlite or redis cache backend, for several workers).
+    # Behind a reverse proxy set RATELIMIT_TRUSTED_PROXIES to the number of
+    # proxies so the client IP is read from X-Forwarded-For
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE = os.environ.get('RATELIMIT_STORAGE') or 'memory'
+    RATELIMIT_MAX_BUCKETS = 100000
+    RATELIMIT_TRUSTED_PROXIES = int(os.environ.get('RATELIMIT_TRUSTED_PROXIES', 0))
+    RATE_LIMITS = {
+        'auth.login': '10/minute',
+        'bookings.get_booking_by_reference': '30/minute',
+        'support.get_ticket_by_number': '30/minute',
+        'enquiry.submit_enquiry': '5/minute',
+        'enquiry.get_enquiry': '30/minute'
+    }
+    
+    # Responses kept for Idempotency-Key replays (seconds), and how long a
+    # request holds its key before a stuck one can be retried. With the redis
+    # cache backend, IDEMPOTENCY_URL can name a server that never evicts keys
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+    IDEMPOTENCY_LOCK_TTL = 60
+    IDEMPOTENCY_URL = os.environ.get('IDEMPOTENCY_URL') or ''
+    
+    # Most bookings accepted by one POST /api/bookings/bulk
+    MAX_BULK_BOOKINGS = 200
+    
+    # Seat holds: default and longest hold in minutes, and the most seats one
+    # user may hold at once; the sweeper releases expired holds every
+    # HOLD_SWEEP_INTERVAL seconds (0 turns it off), HOLD_SWEEP_BATCH at a time
+    HOLD_MINUTES = 10
+    MAX_HOLD_MINUTES = 30
+    MAX_HELD_SEATS = int(os.environ.get('MAX_HELD_SEATS', 18))
+    HOLD_SWEEP_INTERVAL = int(os.environ.get('HOLD_SWEEP_INTERVAL', 30))
+    HOLD_SWEEP_BATCH = 500
+    
+    # Encode JSON responses with orjson when it is installed
+    FAST_JSON = os.environ.get('FAST_JSON', 'true').lower() == 'true'
+    
+    # Cache backend: 'memory' (per process), 'sqlite' (file shared by the
+    # workers on one host, CACHE_URL is the path) or 'redis' (CACHE_URL is
+    # redis://host:port/db)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
+    CACHE_URL = os.environ.get('CACHE_URL') or ''
+    CACHE_KEY_PREFIX = 'aerobook:'
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 4096))
+    CACHE_DEFAULT_TTL = 300
+    
+    # Flight search results (seconds)
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 60))
+    
+    # Stale-while-revalidate for supplier results: fresh for SEARCH_FRESH_SECONDS,
+    # then served stale for up to SEARCH_STALE_SECONDS more while a background
+    # worker (SEARCH_REFRESH_WORKERS) fetches a new copy
+    SEARCH_FRESH_SECONDS = int(os.environ.get('SEARCH_FRESH_SECONDS', 60))
+    SEARCH_STALE_SECONDS = int(os.environ.get('SEARCH_STALE_SECONDS', 300))
+    SEARCH_REFRESH_WORKERS = int(os.environ.get('SEARCH_REFRESH_WORKERS', 4))
+    
+    # Pool and search stats endpoints (see internal.py): hidden unless
+    # STATS_ENABLED; with STATS_TOKEN set they also need X-Stats-Token
+    STATS_ENABLED = os.environ.get('STATS_ENABLED', 'false').lower() == 'true'
+    STATS_TOKEN = os.environ.get('STATS_TOKEN') or ''
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     TESTING = False
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    STATS_ENABLED = os.environ.get('STATS_ENABLED', 'true').lower() == 'true'
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -35,7 +149,11 @@ class TestingConfig(Config):
     """Testing configuration"""
     DEBUG = True
     TESTING = True
+    RATELIMIT_ENABLED = False
     SQLALCHEMY_DATABASE_URI = 'sqlite:///test_aerobook.db'
+    DB_POOL_SIZE = 2
+    DB_POOL_TIMEOUT = 5
+    SQLITE_SYNCHRONOUS = 'OFF'
 
 # Configuration dictionary
 config = {
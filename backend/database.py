@@ -0,0 +1,117 @@
+"""Database engine options and connection pool metrics
+
+engine_options() turns the DB_* and SQLITE_* settings of the active config
+class into SQLALCHEMY_ENGINE_OPTIONS:
+
+- Server databases (PostgreSQL, MySQL) get a MeteredQueuePool with
+  DB_POOL_SIZE connections, DB_MAX_OVERFLOW extra ones under load,
+  DB_POOL_TIMEOUT seconds of waiting before a request fails, connections
+  recycled after DB_POOL_RECYCLE seconds and a pre-ping on checkout.
+- SQLite files get the same pool without the pre-ping and recycle, which
+  guard against a server dropping idle connections. apply_sqlite_pragmas()
+  sets WAL, synchronous and busy_timeout on every new connection. In-memory
+  SQLite keeps Flask-SQLAlchemy's single shared connection.
+
+MeteredQueuePool times every checkout, so pool_stats() can show whether
+requests wait for connections or time out. Use it to size the pool rather
+than guessing. The numbers are per worker process.
+"""
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that counts checkouts, time spent waiting and timeouts"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_checked_out = 0
+
+    def connect(self):
+        began = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeout:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - began
+        with self._metrics_lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+        return connection
+
+    def stats(self):
+        """Live pool occupancy and checkout counters"""
+        with self._metrics_lock:
+            return {
+                'pool': type(self).__name__,
+                'size': self.size(),
+                'max_overflow': self._max_overflow,
+                'timeout': self._timeout,
+                'checked_in': self.checkedin(),
+                'checked_out': self.checkedout(),
+                'overflow': max(self.overflow(), 0),
+                'peak_checked_out': self.peak_checked_out,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 3)
+            }
+
+def is_sqlite_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if is_sqlite_memory(url):
+        return {}
+    options = {
+        'poolclass': MeteredQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT']
+    }
+    if url.get_backend_name() != 'sqlite':
+        options['pool_recycle'] = config['DB_POOL_RECYCLE']
+        options['pool_pre_ping'] = config['DB_POOL_PRE_PING']
+    return options
+
+def apply_sqlite_pragmas(engine, config):
+    """Run the SQLITE_* pragmas on every new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = [f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}",
+               f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}"]
+    if not is_sqlite_memory(engine.url):
+        pragmas.insert(0, f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def pool_stats(engine):
+    """Stats of the engine's pool (occupancy only for pools without metrics)"""
+    pool = engine.pool
+    if isinstance(pool, MeteredQueuePool):
+        stats = pool.stats()
+    else:
+        stats = {'pool': type(pool).__name__, 'status': pool.status()}
+    stats['dialect'] = engine.dialect.name
+    return stats
@@ -0,0 +1,129 @@
+"""Short-lived seat holds
+
+A hold takes seats out of a flight instance (the same atomic conditional
+UPDATE a booking uses) for a few minutes. Either create_booking converts it
+into a booking, or the sweeper gives the seats back when it expires.
+Conversion and expiry both claim the hold with a conditional DELETE, so
+whichever runs first wins and the seats move exactly once.
+
+The sweeper runs on a background thread in each worker. It pulls expired
+holds in batches from the expires_at index instead of checking holds on the
+request path, and it is safe to run in every worker at once.
+"""
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select
+from models import db, SeatHold
+from inventory import release_seats, reserve_seats
+
+logger = logging.getLogger(__name__)
+
+class HoldLimitExceeded(Exception):
+    """The user already holds as many seats as they may"""
+
+def held_seats(user_id):
+    """Seats in the user's unexpired holds"""
+    return db.session.execute(
+        select(func.coalesce(func.sum(SeatHold.seats), 0))
+        .where(SeatHold.user_id == user_id, SeatHold.expires_at > datetime.utcnow())
+    ).scalar()
+
+def create_hold(user_id, instance_id, seats, minutes, max_held=None):
+    """Reserve seats for minutes; returns the SeatHold or None if too few are left
+
+    Raises HoldLimitExceeded if the user would hold more than max_held seats
+    in all. Runs in the caller's transaction (the caller commits).
+    """
+    if max_held is not None and held_seats(user_id) + seats > max_held:
+        raise HoldLimitExceeded(max_held)
+    if not reserve_seats(instance_id, seats):
+        return None
+    hold = SeatHold(user_id=user_id, flight_instance_id=instance_id, seats=seats,
+                    expires_at=datetime.utcnow() + timedelta(minutes=minutes))
+    db.session.add(hold)
+    return hold
+
+def consume_hold(hold_id, user_id):
+    """Claim an unexpired hold for a booking; returns (instance_id, seats) or None
+
+    The hold's seats now belong to the caller, in the caller's transaction.
+    """
+    claimed = db.session.execute(
+        delete(SeatHold)
+        .where(SeatHold.id == hold_id, SeatHold.user_id == user_id,
+               SeatHold.expires_at > datetime.utcnow())
+        .returning(SeatHold.flight_instance_id, SeatHold.seats)
+        .execution_options(synchronize_session=False)
+    ).first()
+    return tuple(claimed) if claimed else None
+
+def expire_holds(batch_size=500):
+    """Release the seats of up to batch_size expired holds; returns how many
+
+    Commits its own transaction, one per batch.
+    """
+    now = datetime.utcnow()
+    hold_ids = db.session.execute(
+        select(SeatHold.id).where(SeatHold.expires_at <= now)
+        .order_by(SeatHold.expires_at).limit(batch_size)
+    ).scalars().all()
+    if not hold_ids:
+        return 0
+
+    # Only holds this DELETE removes are released (a booking may claim one first)
+    expired = db.session.execute(
+        delete(SeatHold)
+        .where(SeatHold.id.in_(hold_ids), SeatHold.expires_at <= now)
+        .returning(SeatHold.flight_instance_id, SeatHold.seats)
+        .execution_options(synchronize_session=False)
+    ).all()
+    seats_by_instance = Counter()
+    for instance_id, seats in expired:
+        seats_by_instance[instance_id] += seats
+    for instance_id, seats in seats_by_instance.items():
+        release_seats(instance_id, seats)
+    db.session.commit()
+    return len(expired)
+
+class HoldSweeper:
+    """Background thread expiring holds every interval seconds"""
+
+    def __init__(self, app, interval=30, batch_size=500):
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+        self.expired = 0
+        self.runs = 0
+
+    def start(self):
+        """Start the sweeper thread; returns self"""
+        self._thread = threading.Thread(target=self._run, name='hold-sweeper', daemon=True)
+        self._thread.start()
+        return self
+
+    def sweep(self):
+        """Expire every currently expired hold, one batch at a time"""
+        total = 0
+        with self.app.app_context():
+            while True:
+                count = expire_holds(self.batch_size)
+                total += count
+                if count < self.batch_size:
+                    break
+        self.expired += total
+        self.runs += 1
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception('Seat hold sweep failed')
+
+    def stop(self):
+        self._stop.set()
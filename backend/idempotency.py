@@ -0,0 +1,169 @@
+"""Idempotency-Key support for create endpoints
+
+A client sends the same Idempotency-Key header on every retry of one
+logical request. The first request claims the key in the cache backend with
+an atomic set-if-absent, runs, and stores its response for
+IDEMPOTENCY_TTL seconds. Retries get the stored response back (with an
+Idempotent-Replayed header) instead of creating a second booking or ticket.
+
+- A retry that arrives while the first request is still running gets 409.
+- Reusing a key for a different request body gets 422.
+- Only 2xx responses are stored. After an error the claim is dropped, so
+  the retry runs again.
+- If the backend fails after the view committed, the caller still gets its
+  response. The key then stays claimed for IDEMPOTENCY_TTL where the
+  backend allows, so retries get 409 instead of booking twice.
+
+Keys are scoped to the route and the caller: the user for authenticated
+requests, otherwise the client IP and User-Agent. They are stored as a
+short hash.
+
+Records get a backend of their own, of the same kind as CACHE_BACKEND (see
+create_idempotency_backend()). It is bounded by TTL only, so search
+traffic can never evict a stored response or a pending claim. With the
+sqlite or redis backend, a retry that lands on another worker is still
+caught.
+"""
+import hashlib
+import logging
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from cache import MemoryCache, RedisCache, SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+def _digest(*parts):
+    return hashlib.sha256('\x1f'.join(parts).encode()).hexdigest()[:32]
+
+def create_idempotency_backend(config, cache):
+    """TTL-only backend for idempotency records, beside the shared cache
+
+    - memory: a separate in-process store with no size limit.
+    - sqlite: its own table in the cache file, never pruned by size.
+    - redis: keys under their own prefix, on IDEMPOTENCY_URL if set (else
+      CACHE_URL). Redis can still evict keys under maxmemory, so point it at
+      a server or database with maxmemory-policy noeviction.
+    """
+    ttl = config.get('IDEMPOTENCY_TTL', 86400)
+    if isinstance(cache, SQLiteCache):
+        return SQLiteCache(cache.path, maxsize=None, default_ttl=ttl, table='idempotency_entries')
+    if isinstance(cache, RedisCache):
+        url = config.get('IDEMPOTENCY_URL') or config.get('CACHE_URL') or 'redis://localhost:6379/0'
+        return RedisCache(url, default_ttl=ttl, key_prefix=config.get('CACHE_KEY_PREFIX', 'aerobook:') + 'idem:')
+    return MemoryCache(maxsize=None, default_ttl=ttl)
+
+class IdempotencyStore:
+    """Claims keys and stores finished responses in a cache backend"""
+
+    def __init__(self, backend, ttl=86400, lock_ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.replays = 0
+        self.conflicts = 0
+        self.errors = 0
+
+    @staticmethod
+    def cache_key(scope, identity, key):
+        return 'idem:' + _digest(scope, str(identity), key)
+
+    def claim(self, cache_key, fingerprint):
+        """Claim a key for a new request; returns None or the existing entry"""
+        if self.backend.add(cache_key, {'state': 'pending', 'fingerprint': fingerprint}, self.lock_ttl):
+            return None
+        # Lost the race to a request that finished (or gave up) right after
+        # we looked; report it as still running and let the client retry
+        return self.backend.get(cache_key) or {'state': 'pending', 'fingerprint': fingerprint}
+
+    def complete(self, cache_key, fingerprint, response):
+        """Store a finished response for replay
+
+        The request has already committed, so a backend error is logged
+        rather than raised. The claim is then kept for the full TTL if the
+        backend takes it: a retry must not run the request a second time.
+        """
+        try:
+            self.backend.set(cache_key, {
+                'state': 'done',
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'mimetype': response.mimetype,
+                'body': response.get_data(as_text=True)
+            }, self.ttl)
+            return
+        except Exception:
+            self.errors += 1
+            logger.exception('Storing an idempotent response failed; keeping its key claimed')
+        try:
+            self.backend.set(cache_key, {'state': 'pending', 'fingerprint': fingerprint}, self.ttl)
+        except Exception:
+            logger.exception('Keeping the idempotency claim failed; it expires in %ss', self.lock_ttl)
+
+    def release(self, cache_key):
+        """Drop a claim so the request can run again (else it expires after lock_ttl)"""
+        try:
+            self.backend.delete(cache_key)
+        except Exception:
+            self.errors += 1
+            logger.exception('Releasing an idempotency claim failed')
+
+    def stats(self):
+        return {'ttl': self.ttl, 'replays': self.replays, 'conflicts': self.conflicts, 'errors': self.errors}
+
+def _identity():
+    """The user id, or the client's address and User-Agent when anonymous"""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    if identity is not None:
+        return f'user:{identity}'
+    return 'anon:' + _digest(request.remote_addr or '', request.headers.get('User-Agent', ''))
+
+def idempotent(scope):
+    """Decorator honouring the Idempotency-Key header on a view"""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None:
+                return view(*args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return jsonify({'error': f'{HEADER} must be 1-{MAX_KEY_LENGTH} characters'}), 400
+
+            store = current_app.extensions['idempotency']
+            cache_key = store.cache_key(scope, _identity(), key)
+            fingerprint = _digest(request.get_data(as_text=True))
+
+            entry = store.claim(cache_key, fingerprint)
+            if entry is not None:
+                if entry['fingerprint'] != fingerprint:
+                    store.conflicts += 1
+                    return jsonify({'error': f'{HEADER} was already used for a different request'}), 422
+                if entry['state'] != 'done':
+                    store.conflicts += 1
+                    return jsonify({'error': 'A request with this Idempotency-Key is still in progress'}), 409
+                store.replays += 1
+                replay = current_app.response_class(entry['body'], status=entry['status'],
+                                                    mimetype=entry['mimetype'])
+                replay.headers['Idempotent-Replayed'] = 'true'
+                return replay
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                store.release(cache_key)
+                raise
+            if 200 <= response.status_code < 300:
+                store.complete(cache_key, fingerprint, response)
+            else:
+                store.release(cache_key)
+            return response
+        return wrapper
+    return decorator
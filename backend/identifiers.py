@@ -0,0 +1,144 @@
+"""Collision-free booking references and ticket numbers
+
+Each identifier is a value from a named sequence in the id_sequences table,
+scrambled and encoded:
+
+- Workers reserve values in blocks (one UPDATE per ID_BLOCK_SIZE identifiers),
+  so issuing an identifier normally costs no query and two workers can never
+  hold the same value.
+- A 4-round Feistel network, cycle-walked into the code space, permutes the
+  value. Consecutive bookings don't get consecutive references, and the
+  mapping is a bijection, so distinct values always give distinct codes.
+- The result is six base-31 characters (Crockford's alphabet without I, L, O
+  or U, and without Z) plus a check character. The weighted sum of all seven
+  is 0 mod 31, which catches any single mistyped character or swapped
+  neighbours.
+
+The Feistel keys are derived from the sequence name and must never change
+once identifiers have been issued.
+"""
+import hashlib
+import threading
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, IdSequence
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXY'
+BASE = len(ALPHABET)  # prime, so no weight/digit product vanishes mod BASE
+
+CODE_LENGTH = 6
+CAPACITY = BASE ** CODE_LENGTH
+
+# The Feistel network works on 30 bits, the smallest even width covering CAPACITY
+HALF_BITS = 15
+HALF_MASK = (1 << HALF_BITS) - 1
+
+def round_keys(name, rounds=4):
+    """Fixed per-sequence Feistel round keys"""
+    digest = hashlib.sha256(f'aerobook:{name}'.encode()).digest()
+    return [int.from_bytes(digest[i * 4:i * 4 + 4], 'big') for i in range(rounds)]
+
+def _mix(value, key):
+    value = ((value ^ key) * 0x45D9F3B) & 0xFFFFFFFF
+    return (value ^ (value >> 16)) & HALF_MASK
+
+def _feistel(value, keys):
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for key in keys:
+        left, right = right, left ^ _mix(right, key)
+    return (left << HALF_BITS) | right
+
+def permute(value, keys):
+    """Bijection of [0, CAPACITY) onto itself
+
+    The 30-bit Feistel network is a bijection for any keys; re-applying it
+    until the result falls below CAPACITY (cycle walking) keeps it one.
+    """
+    value = _feistel(value, keys)
+    while value >= CAPACITY:
+        value = _feistel(value, keys)
+    return value
+
+def _weighted_sum(code):
+    return sum((position + 1) * ALPHABET.index(char) for position, char in enumerate(code))
+
+def check_char(code):
+    """Character that makes the weighted sum of code + check 0 mod BASE"""
+    last_weight = len(code) + 1
+    return ALPHABET[-_weighted_sum(code) * pow(last_weight, -1, BASE) % BASE]
+
+def encode(value, keys):
+    """Seven-character code (six digits plus check) for a sequence value"""
+    scrambled = permute(value, keys)
+    digits = []
+    for _ in range(CODE_LENGTH):
+        scrambled, digit = divmod(scrambled, BASE)
+        digits.append(ALPHABET[digit])
+    code = ''.join(reversed(digits))
+    return code + check_char(code)
+
+def is_valid(code):
+    """True if a seven-character code's check character matches"""
+    code = code.upper()
+    return (len(code) == CODE_LENGTH + 1 and all(char in ALPHABET for char in code)
+            and _weighted_sum(code) % BASE == 0)
+
+class IdentifierGenerator:
+    """Issues prefixed codes from block-allocated sequence values"""
+
+    def __init__(self, name, prefix, block_size=100):
+        self.name = name
+        self.prefix = prefix
+        self.block_size = block_size
+        self._keys = round_keys(name)
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+        self.blocks_allocated = 0
+
+    def _allocate(self, size=None):
+        """Reserve the next size (default block_size) values; returns (first, end)"""
+        size = size or self.block_size
+        sequence = IdSequence.__table__
+        while True:
+            with db.engine.begin() as conn:
+                reserved = conn.execute(
+                    update(sequence)
+                    .where(sequence.c.name == self.name)
+                    .values(next_value=sequence.c.next_value + size)
+                ).rowcount
+                if reserved:
+                    end = conn.execute(select(sequence.c.next_value).where(sequence.c.name == self.name)).scalar_one()
+                    self.blocks_allocated += 1
+                    return end - size, end
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(insert(sequence).values(name=self.name, next_value=0))
+            except IntegrityError:
+                pass  # another worker created the sequence first
+
+    def next(self):
+        """Next identifier, e.g. 'BK7G2Q9XK'"""
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._allocate()
+            value = self._next
+            self._next += 1
+        if value >= CAPACITY:
+            raise RuntimeError(f'Identifier sequence {self.name!r} is exhausted')
+        return self.prefix + encode(value, self._keys)
+
+    def next_many(self, count):
+        """count identifiers at once, with at most one block allocation"""
+        with self._lock:
+            values = list(range(self._next, min(self._end, self._next + count)))
+            self._next += len(values)
+            if len(values) < count:
+                # One block big enough for the rest; its leftovers serve later calls
+                first, end = self._allocate(max(self.block_size, count - len(values)))
+                taken = count - len(values)
+                values.extend(range(first, first + taken))
+                self._next, self._end = first + taken, end
+        if values and values[-1] >= CAPACITY:
+            raise RuntimeError(f'Identifier sequence {self.name!r} is exhausted')
+        return [self.prefix + encode(value, self._keys) for value in values]
@@ -0,0 +1,27 @@
+"""Access to operational endpoints
+
+/api/health/db and /api/flights/search/stats show pool sizes, cache and
+supplier addresses and traffic counters. Those help an attacker more than a
+customer, so these endpoints answer 404 unless STATS_ENABLED is set (it is
+on in development). With STATS_TOKEN set, a caller must also send that
+token in the X-Stats-Token header, so the endpoints can stay on behind a
+monitoring scraper.
+"""
+import hmac
+from functools import wraps
+from flask import current_app, jsonify, request
+
+TOKEN_HEADER = 'X-Stats-Token'
+
+def internal_only(view):
+    """Decorator hiding a view unless STATS_ENABLED (and STATS_TOKEN) allow it"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_app.config['STATS_ENABLED']:
+            return jsonify({'error': 'Not found'}), 404
+        token = current_app.config['STATS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get(TOKEN_HEADER, ''), token):
+            return jsonify({'error': 'Not found'}), 404
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,261 @@
+"""Flight inventory: schedule seeding, bulk import and route/date lookups"""
+import csv
+import random
+import re
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.orm import contains_eager
+from models import db, Flight, FlightInstance
+
+# Mock airlines data
+AIRLINES = [
+    {'name': 'SkyWings', 'code': 'SW', 'rating': 4.5},
+    {'name': 'AeroElite', 'code': 'AE', 'rating': 4.7},
+    {'name': 'CloudNine', 'code': 'CN', 'rating': 4.3},
+    {'name': 'JetStream', 'code': 'JS', 'rating': 4.6},
+    {'name': 'FlyHigh', 'code': 'FH', 'rating': 4.4},
+    {'name': 'Pacific Air', 'code': 'PA', 'rating': 4.8},
+    {'name': 'Continental Express', 'code': 'CE', 'rating': 4.2}
+]
+
+AIRLINES_BY_CODE = {airline['code']: airline for airline in AIRLINES}
+
+# Airports served by the seeded schedule
+SEED_AIRPORTS = ['JFK', 'LHR', 'NRT', 'DXB', 'SIN', 'CDG', 'LAX', 'SYD', 'HKG', 'FRA', 'YYZ', 'BOM']
+
+AIRCRAFT = ['Boeing 737', 'Airbus A320', 'Boeing 787', 'Airbus A350']
+
+# Search limits
+MAX_FLEX_DAYS = 3
+MAX_SEARCH_RESULTS = 200
+MAX_PASSENGERS = 9
+
+CSV_COLUMNS = ['flight_number', 'airline_code', 'origin', 'destination', 'departure_time',
+               'duration_minutes', 'stops', 'aircraft', 'departure_date', 'seats_available',
+               'base_fare']
+
+_CODE_IN_PARENS = re.compile(r'\(([A-Za-z]{3})\)')
+
+def normalize_airport_code(value):
+    """Normalize 'JFK', 'jfk' or 'New York (JFK)' to 'JFK'"""
+    value = (value or '').strip()
+    match = _CODE_IN_PARENS.search(value)
+    if match:
+        return match.group(1).upper()
+    return value.upper()
+
+def format_time(minutes):
+    """Format minutes after midnight as HH:MM (wrapping past midnight)"""
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def _insert_instances(rows, batch_size):
+    """Bulk insert flight instance rows in batches"""
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(FlightInstance), rows[start:start + batch_size])
+
+def seed_flights(days=30, start_date=None, flights_per_route=8, seed=42, batch_size=5000):
+    """Generate a deterministic schedule between SEED_AIRPORTS and bulk insert it
+
+    Returns a (flights, instances) tuple with the number of rows created.
+    """
+    rng = random.Random(seed)
+    start_date = start_date or date.today()
+    next_number = {airline['code']: 1000 for airline in AIRLINES}
+
+    flights = []
+    for origin in SEED_AIRPORTS:
+        for destination in SEED_AIRPORTS:
+            if origin == destination:
+                continue
+            for i in range(flights_per_route):
+                airline = rng.choice(AIRLINES)
+                number = next_number[airline['code']]
+                next_number[airline['code']] += 1
+
+                dep_minutes = (6 + i * 2) * 60 + rng.choice([0, 30])
+                duration_minutes = rng.randint(2, 8) * 60 + rng.choice([0, 15, 30, 45])
+
+                flights.append({
+                    'flight_number': f"{airline['code']}{number}",
+                    'airline': airline['name'],
+                    'airline_code': airline['code'],
+                    'origin': origin,
+                    'destination': destination,
+                    'departure_time': format_time(dep_minutes),
+                    'arrival_time': format_time(dep_minutes + duration_minutes),
+                    'duration_minutes': duration_minutes,
+                    'stops': rng.choice([0, 0, 0, 1]),  # Mostly non-stop
+                    'aircraft': rng.choice(AIRCRAFT)
+                })
+
+    db.session.execute(insert(Flight), flights)
+    ids = dict(db.session.execute(
+        select(Flight.flight_number, Flight.id).where(
+            Flight.flight_number.in_([f['flight_number'] for f in flights]))
+    ).all())
+
+    instances = []
+    for flight in flights:
+        base_fare = rng.randint(150, 500)
+        for offset in range(days):
+            instances.append({
+                'flight_id': ids[flight['flight_number']],
+                'origin': flight['origin'],
+                'destination': flight['destination'],
+                'departure_date': start_date + timedelta(days=offset),
+                'departure_time': flight['departure_time'],
+                'seats_available': rng.randint(10, 60),
+                'base_fare': base_fare
+            })
+
+    _insert_instances(instances, batch_size)
+    db.session.commit()
+    return len(flights), len(instances)
+
+def import_flights_csv(path, batch_size=5000):
+    """Bulk import flights and flight instances from a CSV file
+
+    Expects a header row with CSV_COLUMNS. Schedules already present (by
+    flight_number) are reused; one row is one flight instance. Returns a
+    (flights, instances) tuple with the number of rows created.
+    """
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+
+    missing = [col for col in CSV_COLUMNS if rows and col not in rows[0]]
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+
+    numbers = {row['flight_number'] for row in rows}
+    ids = dict(db.session.execute(
+        select(Flight.flight_number, Flight.id).where(Flight.flight_number.in_(list(numbers)))
+    ).all())
+
+    new_flights = {}
+    for row in rows:
+        if row['flight_number'] in ids or row['flight_number'] in new_flights:
+            continue
+        airline = AIRLINES_BY_CODE.get(row['airline_code'], {'name': row['airline_code']})
+        dep_hour, dep_minute = (int(part) for part in row['departure_time'].split(':'))
+        duration_minutes = int(row['duration_minutes'])
+        new_flights[row['flight_number']] = {
+            'flight_number': row['flight_number'],
+            'airline': airline['name'],
+            'airline_code': row['airline_code'],
+            'origin': normalize_airport_code(row['origin']),
+            'destination': normalize_airport_code(row['destination']),
+            'departure_time': format_time(dep_hour * 60 + dep_minute),
+            'arrival_time': format_time(dep_hour * 60 + dep_minute + duration_minutes),
+            'duration_minutes': duration_minutes,
+            'stops': int(row['stops'] or 0),
+            'aircraft': row['aircraft'] or None
+        }
+
+    if new_flights:
+        db.session.execute(insert(Flight), list(new_flights.values()))
+        ids.update(db.session.execute(
+            select(Flight.flight_number, Flight.id).where(Flight.flight_number.in_(list(new_flights)))
+        ).all())
+
+    departure_times = dict(db.session.execute(
+        select(Flight.flight_number, Flight.departure_time).where(Flight.flight_number.in_(list(numbers)))
+    ).all())
+
+    instances = [{
+        'flight_id': ids[row['flight_number']],
+        'origin': normalize_airport_code(row['origin']),
+        'destination': normalize_airport_code(row['destination']),
+        'departure_date': datetime.strptime(row['departure_date'], '%Y-%m-%d').date(),
+        'departure_time': departure_times[row['flight_number']],
+        'seats_available': int(row['seats_available']),
+        'base_fare': float(row['base_fare'])
+    } for row in rows]
+
+    _insert_instances(instances, batch_size)
+    db.session.commit()
+    return len(new_flights), len(instances)
+
+def find_flight_instances(origin, destination, departure_date, passengers=1, flex_days=0,
+                          max_base_fare=None, max_stops=None, sort='price', limit=50):
+    """Look up bookable flight instances for a route around a date
+
+    Every filter is pushed down into SQL. The route/date predicate is an
+    equality (or, with flex_days, a +/- date range) on the leading columns
+    of ix_flight_instances_route_date_time, so sort='departure' is read in
+    index order with no sort step; sort='price' sorts only the matching rows.
+    """
+    query = (FlightInstance.query
+             .join(Flight)
+             .options(contains_eager(FlightInstance.flight))
+             .filter(FlightInstance.origin == origin,
+                     FlightInstance.destination == destination))
+
+    if flex_days:
+        window = timedelta(days=flex_days)
+        query = query.filter(FlightInstance.departure_date.between(departure_date - window,
+                                                                   departure_date + window))
+    else:
+        query = query.filter(FlightInstance.departure_date == departure_date)
+
+    query = query.filter(FlightInstance.seats_available >= passengers)
+    if max_base_fare is not None:
+        query = query.filter(FlightInstance.base_fare <= max_base_fare)
+    if max_stops is not None:
+        query = query.filter(Flight.stops <= max_stops)
+
+    if sort == 'departure':
+        query = query.order_by(FlightInstance.departure_date, FlightInstance.departure_time)
+    else:
+        query = query.order_by(FlightInstance.base_fare, FlightInstance.departure_date,
+                               FlightInstance.departure_time)
+
+    return query.limit(limit).all()
+
+def find_instance_id(flight_number, departure_date):
+    """Id of the flight instance for a flight number and date, or None"""
+    return (db.session.query(FlightInstance.id)
+            .join(Flight)
+            .filter(Flight.flight_number == flight_number,
+                    FlightInstance.departure_date == departure_date)
+            .scalar())
+
+def find_instance_ids(keys):
+    """Instance ids for many (flight_number, departure_date) pairs in one query
+
+    Returns a dict; pairs without an instance are left out.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    rows = db.session.execute(
+        select(Flight.flight_number, FlightInstance.departure_date, FlightInstance.id)
+        .join(Flight, FlightInstance.flight_id == Flight.id)
+        .where(tuple_(Flight.flight_number, FlightInstance.departure_date).in_(keys))
+    )
+    return {(flight_number, departure_date): instance_id
+            for flight_number, departure_date, instance_id in rows}
+
+def reserve_seats(instance_id, seats):
+    """Atomically take seats from a flight instance; False if too few are left
+
+    A single conditional UPDATE, so concurrent bookings can never oversell:
+    the database re-checks seats_available under the row lock. Runs in the
+    caller's transaction (the caller commits or rolls back).
+    """
+    result = db.session.execute(
+        update(FlightInstance)
+        .where(FlightInstance.id == instance_id, FlightInstance.seats_available >= seats)
+        .values(seats_available=FlightInstance.seats_available - seats)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+def release_seats(instance_id, seats):
+    """Atomically return seats to a flight instance (in the caller's transaction)"""
+    db.session.execute(
+        update(FlightInstance)
+        .where(FlightInstance.id == instance_id)
+        .values(seats_available=FlightInstance.seats_available + seats)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,91 @@
+"""Bring existing databases up to date with columns and indexes on the models
+
+db.create_all() only creates missing tables, so a column or index added to
+an existing model never reaches a database created before it.
+
+ensure_columns() adds missing columns. That is a quick metadata change,
+and queries fail without it, so create_app runs it on every start. A NOT
+NULL column can be added only when it has a server default, or a statement
+in BACKFILLS that fills it from other data. In the second case it is added
+as nullable and filled at once, and the models keep new rows non-null.
+
+ensure_indexes() creates every declared index the database does not have
+yet. It is run by `flask --app app create-indexes` (run.sh does this on
+every start) rather than inside create_app, because building an index on a
+large table can take a while and should not stall worker startup; the app
+only warns.
+"""
+from sqlalchemy import Column, inspect
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn
+from models import db
+
+# Statements filling NOT NULL columns added after their tables, by (table, column)
+BACKFILLS = {
+    ('flight_instances', 'departure_time'):
+        'UPDATE flight_instances SET departure_time = '
+        '(SELECT flights.departure_time FROM flights WHERE flights.id = flight_instances.flight_id) '
+        'WHERE departure_time IS NULL'
+}
+
+def missing_columns():
+    """(table, column) pairs declared on the models but absent from the database"""
+    inspector = inspect(db.engine)
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        missing.extend((table, column) for column in table.columns if column.name not in existing)
+    return missing
+
+def ensure_columns():
+    """Add missing columns (backfilling where needed); returns their 'table.column' names"""
+    added = []
+    for table, column in missing_columns():
+        backfill = BACKFILLS.get((table.name, column.name))
+        definition = column
+        if not column.nullable and column.server_default is None:
+            if backfill is None:
+                raise RuntimeError(f'Cannot add NOT NULL column {table.name}.{column.name} automatically')
+            # Added nullable: the existing rows get their values just after
+            definition = Column(column.name, column.type)
+        ddl = f'ALTER TABLE {table.name} ADD COLUMN {CreateColumn(definition).compile(dialect=db.engine.dialect)}'
+        try:
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(ddl)
+        except DBAPIError:
+            # Another worker may have added it first
+            if (table.name, column.name) in {(t.name, c.name) for t, c in missing_columns()}:
+                raise
+        if backfill:
+            # Some drivers (SQLite's) commit DDL at once, so the backfill is
+            # its own step; it only fills NULLs, so running it after another
+            # worker's ALTER is harmless, and a failure must stop startup
+            try:
+                with db.engine.begin() as conn:
+                    conn.exec_driver_sql(backfill)
+            except DBAPIError as e:
+                raise RuntimeError(f'Added {table.name}.{column.name} but could not backfill it; '
+                                   f'run this before restarting: {backfill}') from e
+        added.append(f'{table.name}.{column.name}')
+    return added
+
+def missing_indexes():
+    """Indexes declared on the models but absent from the database"""
+    inspector = inspect(db.engine)
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return missing
+
+def ensure_indexes():
+    """Create any missing indexes; returns their names"""
+    created = []
+    for index in missing_indexes():
+        index.create(bind=db.engine)
+        created.append(index.name)
+    return created
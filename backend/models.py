@@ -1,6 +1,7 @@
 from datetime import datetime
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from serializers import FieldPlan
 
 db = SQLAlchemy()
 
@@ -24,35 +25,34 @@ class User(db.Model):
     tickets = db.relationship('SupportTicket', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        """Hash and set password (on the app's password hasher pool)"""
+        self.password_hash = current_app.extensions['password_hasher'].hash(password)
     
     def check_password(self, password):
-        """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check password against hash (on the app's password hasher pool)"""
+        return current_app.extensions['password_hasher'].verify(self.password_hash, password)
     
     def to_dict(self):
         """Convert user to dictionary"""
-        return {
-            'id': self.id,
-            'email': self.email,
-            'name': self.name,
-            'phone': self.phone,
-            'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
-            'address': self.address,
-            'frequent_flyer_number': self.frequent_flyer_number,
-            'created_at': self.created_at.isoformat()
-        }
+        return USER_FIELDS.dump(self)
 
 class Booking(db.Model):
     """Booking model for flight reservations"""
     __tablename__ = 'bookings'
+    # Listing queries filter by user (and optionally status) and page by
+    # (created_at, id), so these indexes return rows already in order
+    __table_args__ = (
+        db.Index('ix_bookings_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_bookings_user_status_created', 'user_id', 'status', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     booking_reference = db.Column(db.String(20), unique=True, nullable=False, index=True)
     
     # Flight details
+    # Inventory row the seats were taken from (None for supplier flights)
+    flight_instance_id = db.Column(db.Integer, db.ForeignKey('flight_instances.id'), index=True)
     flight_id = db.Column(db.String(50), nullable=False)
     airline = db.Column(db.String(100), nullable=False)
     origin = db.Column(db.String(100), nullable=False)
@@ -79,32 +79,15 @@ class Booking(db.Model):
     
     def to_dict(self):
         """Convert booking to dictionary"""
-        return {
-            'id': self.id,
-            'booking_reference': self.booking_reference,
-            'flight_id': self.flight_id,
-            'airline': self.airline,
-            'origin': self.origin,
-            'destination': self.destination,
-            'departure_time': self.departure_time,
-            'arrival_time': self.arrival_time,
-            'departure_date': self.departure_date.isoformat(),
-            'duration': self.duration,
-            'passengers': self.passengers,
-            'class_type': self.class_type,
-            'price': self.price,
-            'total_price': self.total_price,
-            'status': self.status,
-            'passenger_name': self.passenger_name,
-            'passenger_email': self.passenger_email,
-            'passenger_phone': self.passenger_phone,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        return BOOKING_FIELDS.dump(self)
 
 class SupportTicket(db.Model):
     """Support ticket model"""
     __tablename__ = 'support_tickets'
+    __table_args__ = (
+        db.Index('ix_support_tickets_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_support_tickets_user_status_created', 'user_id', 'status', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
@@ -127,20 +110,7 @@ class SupportTicket(db.Model):
     
     def to_dict(self):
         """Convert ticket to dictionary"""
-        return {
-            'id': self.id,
-            'ticket_number': self.ticket_number,
-            'subject': self.subject,
-            'description': self.description,
-            'priority': self.priority,
-            'status': self.status,
-            'booking_reference': self.booking_reference,
-            'contact_name': self.contact_name,
-            'contact_email': self.contact_email,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'resolved_at': self.resolved_at.isoformat() if self.resolved_at else None
-        }
+        return TICKET_FIELDS.dump(self)
 
 class Enquiry(db.Model):
     """Enquiry model for contact form submissions"""
@@ -156,12 +126,129 @@ class Enquiry(db.Model):
     
     def to_dict(self):
         """Convert enquiry to dictionary"""
+        return ENQUIRY_FIELDS.dump(self)
+
+class SeatHold(db.Model):
+    """Seats set aside on a flight instance for one user until expires_at"""
+    __tablename__ = 'seat_holds'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    flight_instance_id = db.Column(db.Integer, db.ForeignKey('flight_instances.id'), nullable=False)
+    seats = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # The expiry sweeper reads holds in expires_at order from this index
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def to_dict(self):
+        """Convert seat hold to dictionary"""
+        return HOLD_FIELDS.dump(self)
+
+class RevokedToken(db.Model):
+    """A logged-out access token, kept until the token would have expired"""
+    __tablename__ = 'revoked_tokens'
+    
+    jti = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    # Workers pick up new revocations by revoked_at; expired rows are purged by expires_at
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class IdSequence(db.Model):
+    """Next unreserved value of a named identifier sequence (see identifiers.py)"""
+    __tablename__ = 'id_sequences'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class Flight(db.Model):
+    """Scheduled flight: a flight number operated on a fixed route"""
+    __tablename__ = 'flights'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    flight_number = db.Column(db.String(10), unique=True, nullable=False, index=True)
+    airline = db.Column(db.String(100), nullable=False)
+    airline_code = db.Column(db.String(3), nullable=False)
+    origin = db.Column(db.String(3), nullable=False)
+    destination = db.Column(db.String(3), nullable=False)
+    departure_time = db.Column(db.String(5), nullable=False)  # HH:MM
+    arrival_time = db.Column(db.String(5), nullable=False)  # HH:MM
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    stops = db.Column(db.Integer, default=0)
+    aircraft = db.Column(db.String(50))
+    
+    # Relationships
+    instances = db.relationship('FlightInstance', backref='flight', lazy='dynamic', cascade='all, delete-orphan')
+    
+    @property
+    def duration(self):
+        """Duration formatted as e.g. '4h 15m'"""
+        return f"{self.duration_minutes // 60}h {self.duration_minutes % 60}m"
+    
+    def to_dict(self):
+        """Convert flight to dictionary"""
         return {
-            'id': self.id,
-            'name': self.name,
-            'email': self.email,
-            'subject': self.subject,
-            'message': self.message,
-            'status': self.status,
-            'created_at': self.created_at.isoformat()
+            'id': self.flight_number,
+            'airline': self.airline,
+            'airline_code': self.airline_code,
+            'origin': self.origin,
+            'destination': self.destination,
+            'departure_time': self.departure_time,
+            'arrival_time': self.arrival_time,
+            'duration': self.duration,
+            'stops': self.stops,
+            'aircraft': self.aircraft
         }
+
+class FlightInstance(db.Model):
+    """A scheduled flight operating on a given date, with its seat inventory"""
+    __tablename__ = 'flight_instances'
+    __table_args__ = (
+        db.UniqueConstraint('flight_id', 'departure_date', name='uq_flight_instances_flight_date'),
+        db.Index('ix_flight_instances_route_date_time', 'origin', 'destination', 'departure_date', 'departure_time'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    flight_id = db.Column(db.Integer, db.ForeignKey('flights.id'), nullable=False)
+    
+    # Route and departure time are denormalized from Flight so searches are
+    # a single range scan over the route/date/time index
+    origin = db.Column(db.String(3), nullable=False)
+    destination = db.Column(db.String(3), nullable=False)
+    departure_date = db.Column(db.Date, nullable=False)
+    departure_time = db.Column(db.String(5), nullable=False)  # HH:MM
+    
+    seats_available = db.Column(db.Integer, nullable=False)
+    base_fare = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        """Convert flight instance to dictionary (includes schedule details)"""
+        data = self.flight.to_dict()
+        data.update({
+            'date': self.departure_date.isoformat(),
+            'seats_available': self.seats_available,
+            'base_fare': self.base_fare
+        })
+        return data
+
+# Serialization plans for to_dict() and column-tuple list queries (see serializers.py)
+USER_FIELDS = FieldPlan(User, [
+    'id', 'email', 'name', 'phone', 'date_of_birth', 'address', 'frequent_flyer_number',
+    'created_at'
+])
+BOOKING_FIELDS = FieldPlan(Booking, [
+    'id', 'booking_reference', 'flight_id', 'airline', 'origin', 'destination',
+    'departure_time', 'arrival_time', 'departure_date', 'duration', 'passengers', 'class_type',
+    'price', 'total_price', 'status', 'passenger_name', 'passenger_email', 'passenger_phone',
+    'created_at', 'updated_at'
+])
+TICKET_FIELDS = FieldPlan(SupportTicket, [
+    'id', 'ticket_number', 'subject', 'description', 'priority', 'status', 'booking_reference',
+    'contact_name', 'contact_email', 'created_at', 'updated_at', 'resolved_at'
+])
+HOLD_FIELDS = FieldPlan(SeatHold, [
+    'id', 'flight_instance_id', 'seats', 'created_at', 'expires_at'
+])
+ENQUIRY_FIELDS = FieldPlan(Enquiry, [
+    'id', 'name', 'email', 'subject', 'message', 'status', 'created_at'
+])
@@ -0,0 +1,66 @@
+"""Keyset (cursor) pagination over (created_at, id), newest first
+
+Each page is fetched with a WHERE clause that starts right after the last
+row of the previous page, so page N costs the same index range scan as
+page 1 (unlike OFFSET, which reads and discards every earlier row). The
+position is handed to clients as an opaque, URL-safe continuation token.
+"""
+import base64
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import and_, or_
+
+MAX_PAGE_SIZE = 100
+
+class InvalidCursor(ValueError):
+    """The continuation token is malformed"""
+
+def encode_cursor(created_at, row_id):
+    """Opaque token for the position after (created_at, id)"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """(created_at, id) from a token made by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+def page_size(value):
+    """Validate a ?limit= value, defaulting to ITEMS_PER_PAGE"""
+    if value is None:
+        return current_app.config.get('ITEMS_PER_PAGE', 20)
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be an integer') from None
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+def page_query(query, model, cursor=None, limit=20):
+    """query restricted to the page after cursor, newest first, limit + 1 rows"""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # created_at <= c lets the index seek; the OR breaks ties on id
+        query = query.filter(
+            model.created_at <= created_at,
+            or_(model.created_at < created_at, and_(model.created_at == created_at, model.id < row_id))
+        )
+
+    # One extra row tells us whether another page exists
+    return query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+def paginate(query, model, cursor=None, limit=20):
+    """One page of query, newest first; returns (items, next_cursor or None)"""
+    items = page_query(query, model, cursor, limit).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return items, next_cursor
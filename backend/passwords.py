@@ -0,0 +1,107 @@
+"""Password hashing off the request threads, with load shedding
+
+Werkzeug's password hashes are deliberately slow (around 100ms each). Done
+inline, a burst of logins ties up every worker thread and search and booking
+requests queue behind them. PasswordHasher runs hashes on a small executor
+(PASSWORD_HASH_WORKERS threads or processes). It admits at most
+PASSWORD_HASH_QUEUE more hashes waiting, and refuses anything beyond that at
+once with HasherBusy, which create_app() turns into a 503 with Retry-After.
+A slot is freed only when its hash has actually finished, so the bound
+holds even for hashes whose callers gave up after PASSWORD_HASH_TIMEOUT
+(and got HasherBusy too). Login storms therefore cost a bounded number of
+threads and fail fast.
+
+The executor choice:
+- Threads are enough for scrypt and pbkdf2, since hashlib releases the GIL
+  while hashing.
+- A process pool keeps even the Python-level work off the web process.
+- PASSWORD_HASH_WORKERS=0 hashes inline, as before.
+
+Successful logins rehash a password stored with a method other than
+PASSWORD_HASH_METHOD, so raising the cost is a config change.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import check_password_hash, generate_password_hash
+
+class HasherBusy(Exception):
+    """Every hashing slot is taken; the caller should answer 503"""
+
+class PasswordHasher:
+    """Bounded executor for generating and checking password hashes"""
+
+    def __init__(self, method='scrypt', workers=2, max_queue=2, executor='thread', timeout=10):
+        self.method = method
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._method_prefix = None
+        self._slots = threading.BoundedSemaphore(workers + max_queue) if workers else None
+        if not workers:
+            self._executor = None
+        elif executor == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        elif executor == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        else:
+            raise ValueError(f'Unknown PASSWORD_HASH_EXECUTOR: {executor}')
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.shed = 0
+        self.timeouts = 0
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.shed += 1
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Runs once the hash finishes (or is cancelled before it starts)
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise HasherBusy() from None
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def hash(self, password):
+        """New hash of password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """True if password matches pwhash"""
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if pwhash was made with a different method or cost"""
+        if self._method_prefix is None:
+            # Werkzeug fills in default costs ('scrypt' -> 'scrypt:32768:8:1'); hash once to learn them
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._method_prefix
+
+    def stats(self):
+        """Executor size and counters"""
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'shed': self.shed,
+                'timeouts': self.timeouts
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
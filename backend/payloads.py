@@ -0,0 +1,29 @@
+"""Pre-encoded JSON payloads for reference data that only changes on deploy"""
+import hashlib
+import json
+from flask import Response, request
+
+# Browsers and CDNs may reuse reference data for this long before revalidating
+DEFAULT_MAX_AGE = 3600
+
+class StaticJSONPayload:
+    """JSON serialized once, served as bytes with a strong ETag
+
+    The ETag is a hash of the encoded body, so it changes exactly when the
+    data does and identical deploys agree on it. Requests carrying a
+    matching If-None-Match get an empty 304.
+    """
+
+    def __init__(self, data, max_age=DEFAULT_MAX_AGE):
+        self.body = json.dumps(data, separators=(',', ':'), sort_keys=True).encode()
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.headers = {
+            'ETag': f'"{self.etag}"',
+            'Cache-Control': f'public, max-age={max_age}'
+        }
+
+    def response(self):
+        """304 if the client already has this version, else the encoded body"""
+        if request.if_none_match.contains_weak(self.etag):
+            return Response(status=304, headers=self.headers)
+        return Response(self.body, mimetype='application/json', headers=self.headers)
@@ -0,0 +1,219 @@
+"""Token-bucket rate limiting for unauthenticated endpoints
+
+Each (route, client IP) pair has a bucket holding up to `burst` tokens that
+refills continuously at `rate` tokens per second. A request takes a token or
+gets 429 with Retry-After. Limits come from Config.RATE_LIMITS as
+'N/period' strings (N requests per second/minute/hour, bursts of up to N).
+
+Buckets live in one of three stores, picked by RATELIMIT_STORAGE and
+CACHE_BACKEND:
+
+- MemoryBucketStore, per process. Bounded by evicting the least recently
+  used bucket, which is also the one most likely to have refilled anyway.
+- SQLiteBucketStore, shared by the workers on one host (in the cache file).
+- RedisBucketStore, shared by every host (one Lua script call per check).
+
+Every check is O(1). If a shared store fails, the request is let through
+(and logged) rather than taking the site down with it.
+"""
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, jsonify, request
+from cache import RedisCache, SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+def parse_limit(limit):
+    """'30/minute' -> (rate in tokens per second, burst)"""
+    count, _, period = limit.partition('/')
+    count = int(count)
+    if count < 1 or period not in PERIODS:
+        raise ValueError(f'Invalid rate limit {limit!r} (expected N/second, N/minute or N/hour)')
+    return count / PERIODS[period], count
+
+def _refill(tokens, updated_at, now, rate, burst):
+    return min(burst, tokens + (now - updated_at) * rate)
+
+def _decide(tokens, rate):
+    """(allowed, tokens left, seconds until a token is available)"""
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+class MemoryBucketStore:
+    """Per-process buckets, least recently used evicted beyond max_buckets"""
+
+    def __init__(self, max_buckets=100000):
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def take(self, key, rate, burst):
+        """Take one token; returns (allowed, retry_after seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            allowed, tokens, retry_after = _decide(_refill(tokens, updated_at, now, rate, burst), rate)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        return allowed, retry_after
+
+    def stats(self):
+        return {'storage': 'memory', 'buckets': len(self._buckets),
+                'max_buckets': self.max_buckets, 'evictions': self.evictions}
+
+class SQLiteBucketStore:
+    """Buckets in a SQLite file shared by every worker process on one host
+
+    Idle rows are deleted every PRUNE_EVERY checks: a bucket untouched for
+    idle_seconds has refilled, so dropping it changes nothing.
+    """
+
+    PRUNE_EVERY = 1024
+
+    def __init__(self, path, idle_seconds=3600):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._checks = 0
+        self._conn().execute('CREATE TABLE IF NOT EXISTS rate_buckets '
+                             '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst):
+        conn = self._conn()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock first, so the read-modify-write is atomic
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, rate, burst) if row else burst
+            allowed, tokens, retry_after = _decide(tokens, rate)
+            conn.execute('INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._checks += 1
+        if self._checks % self.PRUNE_EVERY == 0:
+            conn.execute('DELETE FROM rate_buckets WHERE updated_at < ?', (now - self.idle_seconds,))
+        return allowed, retry_after
+
+    def stats(self):
+        count = self._conn().execute('SELECT COUNT(*) FROM rate_buckets').fetchone()[0]
+        return {'storage': 'sqlite', 'path': self.path, 'buckets': count}
+
+# KEYS[1] = bucket; ARGV = rate, burst, now, ttl. Returns {allowed, retry_after * 1000}
+TAKE_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = burst
+if bucket[1] then
+    tokens = math.min(burst, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * rate)
+end
+local allowed, retry_after = 0, math.ceil((1 - tokens) / rate * 1000)
+if tokens >= 1 then
+    allowed, retry_after, tokens = 1, 0, tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {allowed, retry_after}
+"""
+
+class RedisBucketStore:
+    """Buckets on the Redis server behind a RedisCache
+
+    Buckets expire once they would have refilled, so idle ones cost nothing.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def take(self, key, rate, burst):
+        ttl = math.ceil(burst / rate) + 1
+        allowed, retry_after = self.cache._execute('EVAL', TAKE_SCRIPT, 1, self.cache.key_prefix + 'rate:' + key,
+                                                   rate, burst, repr(time.time()), ttl)
+        return bool(allowed), retry_after / 1000
+
+    def stats(self):
+        return {'storage': 'redis', 'server': f'{self.cache.host}:{self.cache.port}/{self.cache.db}'}
+
+def create_bucket_store(config, cache):
+    """Bucket store selected by RATELIMIT_STORAGE ('memory' or 'shared')"""
+    storage = config.get('RATELIMIT_STORAGE', 'memory')
+    if storage == 'memory':
+        return MemoryBucketStore(max_buckets=config.get('RATELIMIT_MAX_BUCKETS', 100000))
+    if storage == 'shared':
+        # Shared buckets live wherever the shared cache backend does
+        if isinstance(cache, RedisCache):
+            return RedisBucketStore(cache)
+        if isinstance(cache, SQLiteCache):
+            return SQLiteBucketStore(cache.path)
+        raise ValueError('RATELIMIT_STORAGE=shared needs CACHE_BACKEND=sqlite or redis')
+    raise ValueError(f'Unknown RATELIMIT_STORAGE: {storage}')
+
+class RateLimiter:
+    """Per-route, per-client-IP limits on top of a bucket store"""
+
+    def __init__(self, store, limits):
+        self.store = store
+        self.limits = {endpoint: parse_limit(limit) for endpoint, limit in limits.items()}
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+
+    def check(self, endpoint, client):
+        """(allowed, retry_after seconds) for one request"""
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return True, 0.0
+        try:
+            allowed, retry_after = self.store.take(f'{endpoint}:{client}', *limit)
+        except Exception:
+            logger.exception('Rate limit check failed; allowing the request')
+            self.errors += 1
+            return True, 0.0
+        if allowed:
+            self.allowed += 1
+        else:
+            self.limited += 1
+        return allowed, retry_after
+
+    def stats(self):
+        stats = self.store.stats()
+        stats.update({'allowed': self.allowed, 'limited': self.limited, 'errors': self.errors})
+        return stats
+
+def enforce_rate_limits():
+    """before_request hook: 429 when the client's bucket for this route is empty"""
+    # CORS preflights come before the real request; charging them would
+    # halve a browser client's limit
+    if request.method == 'OPTIONS':
+        return None
+    limiter = current_app.extensions['rate_limiter']
+    allowed, retry_after = limiter.check(request.endpoint, request.remote_addr)
+    if allowed:
+        return None
+    response = jsonify({'error': 'Too many requests, slow down'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
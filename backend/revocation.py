@@ -0,0 +1,95 @@
+"""Revoked access tokens (logout)
+
+Flask-JWT-Extended asks is_revoked() about every protected request, so the
+check is a dict lookup in memory. The revoked_tokens table is the durable
+copy that every worker shares:
+
+- revoke() writes a row and adds the jti to this worker's set at once.
+- Other workers pull new rows, at most once every REVOCATION_SYNC_SECONDS,
+  during a check. That costs one indexed query per interval rather than one
+  per request. A token revoked in one worker is therefore refused by all of
+  them within that interval.
+- Entries expire with the token itself. An expired token is rejected by
+  its exp claim anyway, so both the set and the table drop it then.
+
+Syncing and purging happen inside the JWT check, before the view runs. They
+use their own connection, never the request's session, so a failed sync
+cannot leave the view a broken transaction. Purging cannot commit anything
+the view has staged either.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, select
+from models import db, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Re-read rows this far behind the last sync, so a revocation whose
+# transaction committed late (with an older revoked_at) is not missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+# How often (seconds) a worker purges expired rows from the table
+PURGE_INTERVAL = 3600
+
+class RevocationList:
+    """In-memory set of revoked token ids backed by the revoked_tokens table"""
+
+    def __init__(self, sync_interval=5):
+        self.sync_interval = sync_interval
+        self._revoked = {}  # jti -> expiry (epoch seconds)
+        self._lock = threading.Lock()
+        self._synced_at = 0.0
+        self._sync_watermark = None
+        self._purged_at = time.monotonic()
+        self.syncs = 0
+
+    def revoke(self, jti, expires_at, user_id=None):
+        """Revoke a token until expires_at (epoch seconds); commits"""
+        db.session.merge(RevokedToken(jti=jti, user_id=user_id,
+                                      expires_at=datetime.utcfromtimestamp(expires_at)))
+        db.session.commit()
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti):
+        """True if the token was revoked (in any worker, up to sync_interval ago)"""
+        if time.monotonic() - self._synced_at >= self.sync_interval:
+            try:
+                self.sync()
+            except Exception:
+                # Keep answering from memory; the next check retries
+                logger.exception('Syncing revoked tokens failed')
+        return jti in self._revoked
+
+    def sync(self):
+        """Load revocations made since the last sync and drop expired ones"""
+        now = datetime.utcnow()
+        statement = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > now)
+        if self._sync_watermark is not None:
+            statement = statement.where(RevokedToken.revoked_at > self._sync_watermark - SYNC_OVERLAP)
+        with db.engine.connect() as conn:
+            rows = conn.execute(statement).all()
+        epoch = time.time()
+
+        with self._lock:
+            for jti, expires_at in rows:
+                self._revoked[jti] = expires_at.replace(tzinfo=timezone.utc).timestamp()
+            for jti in [jti for jti, expires in self._revoked.items() if expires <= epoch]:
+                del self._revoked[jti]
+            self._sync_watermark = now
+            self._synced_at = time.monotonic()
+            self.syncs += 1
+
+        if time.monotonic() - self._purged_at >= PURGE_INTERVAL:
+            self._purged_at = time.monotonic()
+            self.purge(now)
+
+    def purge(self, now=None):
+        """Delete rows for tokens that have expired (own transaction)"""
+        with db.engine.begin() as conn:
+            conn.execute(delete(RevokedToken).where(RevokedToken.expires_at <= (now or datetime.utcnow())))
+
+    def stats(self):
+        return {'revoked': len(self._revoked), 'sync_interval': self.sync_interval, 'syncs': self.syncs}
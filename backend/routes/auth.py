@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, get_current_user as jwt_current_user
 from models import db, User
+from passwords import HasherBusy
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -54,10 +55,19 @@ def login():
         return jsonify({'error': 'Email and password required'}), 400
     
     user = User.query.filter_by(email=data['email']).first()
+    hasher = current_app.extensions['password_hasher']
     
-    if not user or not user.check_password(data['password']):
+    if not user or not hasher.verify(user.password_hash, data['password']):
         return jsonify({'error': 'Invalid email or password'}), 401
     
+    # Upgrade a hash made with an older method or cost while we have the password
+    if hasher.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hasher.hash(data['password'])
+            db.session.commit()
+        except HasherBusy:
+            db.session.rollback()  # keep the old hash, the next login tries again
+    
     # Create access token
     access_token = create_access_token(identity=user.id)
     
@@ -71,16 +81,12 @@ def login():
 @jwt_required()
 def get_current_user():
     """Get current logged-in user"""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    return jsonify({'user': user.to_dict()}), 200
+    return jsonify({'user': jwt_current_user()}), 200
 
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    """Logout user (client-side token removal)"""
+    """Logout user by revoking the access token until it expires"""
+    token = get_jwt()
+    current_app.extensions['revoked_tokens'].revoke(token['jti'], token['exp'], user_id=token['sub'])
     return jsonify({'message': 'Logout successful'}), 200
@@ -1,116 +1,344 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Booking, User
+from models import db, Booking, User, FlightInstance, BOOKING_FIELDS
+from routes.flights import invalidate_search_results
+from inventory import MAX_PASSENGERS, find_instance_id, find_instance_ids, release_seats, reserve_seats
+from holds import HoldLimitExceeded, consume_hold, create_hold
+from pagination import InvalidCursor, page_size, paginate
+from exports import EXPORT_FORMATS, export_response
+from idempotency import idempotent
+from sqlalchemy import insert, select
+from sqlalchemy.orm import load_only
 from datetime import datetime
-import random
-import string
 
 bookings_bp = Blueprint('bookings', __name__)
 
 def generate_booking_reference():
-    """Generate unique booking reference"""
-    return 'BK' + ''.join(random.choices(string.digits, k=6))
+    """Generate unique booking reference (see identifiers.py)"""
+    return current_app.extensions['booking_references'].next()
+
+BOOKING_REQUIRED_FIELDS = ['flight_id', 'airline', 'origin', 'destination',
+                           'departure_time', 'arrival_time', 'departure_date',
+                           'passengers', 'class_type', 'price', 'passenger_name',
+                           'passenger_email', 'passenger_phone']
+
+def booking_values(data):
+    """Validated Booking column values from a request body; raises ValueError"""
+    for field in BOOKING_REQUIRED_FIELDS:
+        if field not in data:
+            raise ValueError(f'{field} is required')
+    
+    # Parse date
+    try:
+        dep_date = datetime.strptime(data['departure_date'], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError('Invalid date format')
+    
+    # Calculate total price
+    try:
+        price_per_person = float(data['price'])
+        passengers = int(data['passengers'])
+    except (TypeError, ValueError):
+        raise ValueError('price and passengers must be numbers')
+    
+    if passengers < 1:
+        raise ValueError('passengers must be at least 1')
+    
+    return {
+        'flight_id': data['flight_id'],
+        'airline': data['airline'],
+        'origin': data['origin'],
+        'destination': data['destination'],
+        'departure_time': data['departure_time'],
+        'arrival_time': data['arrival_time'],
+        'departure_date': dep_date,
+        'duration': data.get('duration', ''),
+        'passengers': passengers,
+        'class_type': data['class_type'],
+        'price': price_per_person,
+        'total_price': price_per_person * passengers,
+        'passenger_name': data['passenger_name'],
+        'passenger_email': data['passenger_email'],
+        'passenger_phone': data['passenger_phone'],
+        'status': 'confirmed'
+    }
 
 @bookings_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent('bookings')
 def create_booking():
     """Create a new flight booking"""
     user_id = get_jwt_identity()
     data = request.get_json()
     
-    # Validate required fields
-    required_fields = ['flight_id', 'airline', 'origin', 'destination', 
-                      'departure_time', 'arrival_time', 'departure_date',
-                      'passengers', 'class_type', 'price', 'passenger_name',
-                      'passenger_email', 'passenger_phone']
-    
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'{field} is required'}), 400
-    
-    # Generate booking reference
-    booking_ref = generate_booking_reference()
-    while Booking.query.filter_by(booking_reference=booking_ref).first():
-        booking_ref = generate_booking_reference()
-    
-    # Parse date
     try:
-        dep_date = datetime.strptime(data['departure_date'], '%Y-%m-%d').date()
-    except ValueError:
-        return jsonify({'error': 'Invalid date format'}), 400
+        values = booking_values(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Calculate total price
-    price_per_person = float(data['price'])
-    passengers = int(data['passengers'])
-    total_price = price_per_person * passengers
+    passengers = values['passengers']
+    
+    # Seats come from our inventory when the flight is ours (supplier flights have no instance)
+    instance_id = find_instance_id(values['flight_id'], values['departure_date'])
     
     # Create booking
     booking = Booking(
         user_id=user_id,
-        booking_reference=booking_ref,
-        flight_id=data['flight_id'],
-        airline=data['airline'],
-        origin=data['origin'],
-        destination=data['destination'],
-        departure_time=data['departure_time'],
-        arrival_time=data['arrival_time'],
-        departure_date=dep_date,
-        duration=data.get('duration', ''),
-        passengers=passengers,
-        class_type=data['class_type'],
-        price=price_per_person,
-        total_price=total_price,
-        passenger_name=data['passenger_name'],
-        passenger_email=data['passenger_email'],
-        passenger_phone=data['passenger_phone'],
-        status='confirmed'
+        booking_reference=generate_booking_reference(),
+        flight_instance_id=instance_id,
+        **values
     )
     
     try:
+        # Take the seats and record the booking in one transaction. A hold's
+        # seats are used first; an expired or unknown hold just falls back to
+        # reserving from inventory
+        held_seats = 0
+        if data.get('hold_id'):
+            held = consume_hold(data['hold_id'], user_id)
+            if held and held[0] != instance_id:
+                db.session.rollback()
+                return jsonify({'error': 'Hold is for a different flight'}), 400
+            if held:
+                held_seats = held[1]
+        
+        if instance_id and passengers > held_seats and not reserve_seats(instance_id, passengers - held_seats):
+            db.session.rollback()
+            return jsonify({'error': 'Not enough seats available'}), 409
+        if instance_id and passengers < held_seats:
+            release_seats(instance_id, held_seats - passengers)
+        
         db.session.add(booking)
         db.session.commit()
-        
-        return jsonify({
-            'message': 'Booking created successfully',
-            'booking': booking.to_dict()
-        }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Booking creation failed'}), 500
+    
+    # The booking is committed; a cache failure must not turn it into an error
+    invalidate_search_results(booking.origin, booking.destination, booking.departure_date)
+    return jsonify({
+        'message': 'Booking created successfully',
+        'booking': booking.to_dict()
+    }), 201
 
-@bookings_bp.route('', methods=['GET'])
+@bookings_bp.route('/bulk', methods=['POST'])
 @jwt_required()
-def get_user_bookings():
-    """Get all bookings for current user"""
+@idempotent('bookings-bulk')
+def create_bulk_bookings():
+    """Create many bookings (e.g. a travel agent's group) in one transaction
+
+    Every item is validated first. References are allocated in one go, seats
+    are reserved per flight, and the bookings go in as one bulk INSERT with
+    one commit. Responds 201 when every item was booked, else 207 with the
+    error for each failed item.
+    """
     user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    items = data.get('bookings')
     
-    # Get query parameters for filtering
-    status = request.args.get('status')
+    max_items = current_app.config['MAX_BULK_BOOKINGS']
+    if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+        return jsonify({'error': 'bookings must be a non-empty list of objects'}), 400
+    if len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} bookings per request'}), 400
     
-    query = Booking.query.filter_by(user_id=user_id)
+    results = [None] * len(items)
+    accepted = {}
+    for index, item in enumerate(items):
+        try:
+            accepted[index] = booking_values(item)
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 400, 'error': str(e)}
+    
+    instance_ids = find_instance_ids((values['flight_id'], values['departure_date'])
+                                     for values in accepted.values())
+    
+    # Allocate references before this transaction takes any row locks (the
+    # allocation commits on its own connection)
+    references = current_app.extensions['booking_references'].next_many(len(accepted)) if accepted else []
+    for values, reference in zip(accepted.values(), references):
+        values['booking_reference'] = reference
+    
+    try:
+        # Reserve seats per flight instance: the whole group in one UPDATE,
+        # or item by item (in request order) when the flight is nearly full
+        items_by_instance = {}
+        for index, values in accepted.items():
+            values['flight_instance_id'] = instance_ids.get((values['flight_id'], values['departure_date']))
+            if values['flight_instance_id']:
+                items_by_instance.setdefault(values['flight_instance_id'], []).append(index)
+        
+        for instance_id, indexes in items_by_instance.items():
+            if reserve_seats(instance_id, sum(accepted[index]['passengers'] for index in indexes)):
+                continue
+            for index in indexes:
+                if not reserve_seats(instance_id, accepted[index]['passengers']):
+                    results[index] = {'index': index, 'status': 409, 'error': 'Not enough seats available'}
+                    del accepted[index]
+        
+        if accepted:
+            rows = [{**values, 'user_id': user_id} for values in accepted.values()]
+            # RETURNING the serialized columns skips loading (and, after the
+            # commit, reloading) an ORM object per booking. Rows come back in
+            # any order (keeping the order would cost a statement per row on
+            # SQLite), so match them up by their unique reference
+            created = db.session.execute(insert(Booking).returning(*BOOKING_FIELDS.columns), rows).all()
+            db.session.commit()
+            
+            created = {booking['booking_reference']: booking for booking in BOOKING_FIELDS.dump_rows(created)}
+            for index, values in accepted.items():
+                results[index] = {'index': index, 'status': 201, 'booking': created[values['booking_reference']]}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Bulk booking failed'}), 500
+    
+    for route in {(values['origin'], values['destination'], values['departure_date'])
+                  for values in accepted.values()}:
+        invalidate_search_results(*route)
+    
+    return jsonify({
+        'message': f'{len(accepted)} of {len(items)} bookings created',
+        'created': len(accepted),
+        'failed': len(items) - len(accepted),
+        'results': results
+    }), 201 if len(accepted) == len(items) else 207
+
+@bookings_bp.route('/holds', methods=['POST'])
+@jwt_required()
+def create_seat_hold():
+    """Hold seats on a flight for a few minutes before booking"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    
+    for field in ['flight_id', 'departure_date', 'passengers']:
+        if field not in data:
+            return jsonify({'error': f'{field} is required'}), 400
     
+    try:
+        dep_date = datetime.strptime(data['departure_date'], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid date format'}), 400
+    
+    try:
+        passengers = int(data['passengers'])
+        minutes = int(data.get('minutes', current_app.config['HOLD_MINUTES']))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'passengers and minutes must be integers'}), 400
+    
+    if not 1 <= passengers <= MAX_PASSENGERS:
+        return jsonify({'error': f'passengers must be between 1 and {MAX_PASSENGERS}'}), 400
+    
+    max_minutes = current_app.config['MAX_HOLD_MINUTES']
+    if not 1 <= minutes <= max_minutes:
+        return jsonify({'error': f'minutes must be between 1 and {max_minutes}'}), 400
+    
+    instance_id = find_instance_id(data['flight_id'], dep_date)
+    if not instance_id:
+        return jsonify({'error': 'Flight not found'}), 404
+    
+    try:
+        hold = create_hold(user_id, instance_id, passengers, minutes,
+                           max_held=current_app.config['MAX_HELD_SEATS'])
+        if not hold:
+            db.session.rollback()
+            return jsonify({'error': 'Not enough seats available'}), 409
+        
+        instance = db.session.get(FlightInstance, instance_id)
+        route = (instance.origin, instance.destination, instance.departure_date)
+        db.session.commit()
+    except HoldLimitExceeded as e:
+        db.session.rollback()
+        return jsonify({'error': f'You may hold at most {e} seats at a time; book or let some holds expire'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Hold creation failed'}), 500
+    
+    invalidate_search_results(*route)
+    return jsonify({
+        'message': 'Seats held',
+        'hold': {**hold.to_dict(), 'flight_id': data['flight_id'], 'departure_date': dep_date.isoformat()}
+    }), 201
+
+def bookings_list_query(user_id, status=None, plan=BOOKING_FIELDS):
+    """A user's bookings as plain column tuples (the plan's fields plus the cursor key)
+
+    A read-only list needs no ORM identity map. tools/check_query_plans.py
+    EXPLAINs this same query.
+    """
+    query = Booking.query.filter_by(user_id=user_id)
     if status:
         query = query.filter_by(status=status)
+    return query.with_entities(*plan.select_columns(Booking.created_at, Booking.id))
+
+def bookings_export_statement(user_id, status=None, plan=BOOKING_FIELDS):
+    """A user's bookings for export, oldest first"""
+    statement = select(*plan.columns).where(Booking.user_id == user_id)
+    if status:
+        statement = statement.where(Booking.status == status)
+    return statement.order_by(Booking.created_at, Booking.id)
+
+@bookings_bp.route('', methods=['GET'])
+@jwt_required()
+def get_user_bookings():
+    """Get the current user's bookings, newest first, one page at a time"""
+    user_id = get_jwt_identity()
     
-    bookings = query.order_by(Booking.created_at.desc()).all()
+    try:
+        plan = BOOKING_FIELDS.project(request.args.get('fields'))
+        limit = page_size(request.args.get('limit'))
+        query = bookings_list_query(user_id, request.args.get('status'), plan)
+        rows, next_cursor = paginate(query, Booking, request.args.get('cursor'), limit)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'bookings': [booking.to_dict() for booking in bookings],
-        'count': len(bookings)
+        'bookings': plan.dump_rows(rows),
+        'count': len(rows),
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
     }), 200
 
+@bookings_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_bookings():
+    """Stream the current user's full booking history as NDJSON or CSV"""
+    user_id = get_jwt_identity()
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
+    try:
+        plan = BOOKING_FIELDS.project(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    statement = bookings_export_statement(user_id, request.args.get('status'), plan)
+    return export_response(statement, plan.fields, export_format, 'bookings')
+
 @bookings_bp.route('/<int:booking_id>', methods=['GET'])
 @jwt_required()
 def get_booking(booking_id):
     """Get specific booking details"""
     user_id = get_jwt_identity()
     
-    booking = Booking.query.filter_by(id=booking_id, user_id=user_id).first()
+    try:
+        plan = BOOKING_FIELDS.project(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    booking = Booking.query.options(load_only(*plan.columns)).filter_by(id=booking_id, user_id=user_id).first()
     
     if not booking:
         return jsonify({'error': 'Booking not found'}), 404
     
-    return jsonify({'booking': booking.to_dict()}), 200
+    return jsonify({'booking': plan.dump(booking)}), 200
 
 @bookings_bp.route('/<int:booking_id>', methods=['PUT'])
 @jwt_required()
@@ -155,24 +383,40 @@ def cancel_booking(booking_id):
     if booking.status == 'cancelled':
         return jsonify({'error': 'Booking already cancelled'}), 400
     
-    booking.status = 'cancelled'
-    
     try:
+        # Conditional update, so concurrent cancels give the seats back only once
+        cancelled = (Booking.query
+                     .filter(Booking.id == booking.id, Booking.status != 'cancelled')
+                     .update({'status': 'cancelled'}))
+        if not cancelled:
+            db.session.rollback()
+            return jsonify({'error': 'Booking already cancelled'}), 400
+        
+        if booking.flight_instance_id:
+            release_seats(booking.flight_instance_id, booking.passengers)
+        
         db.session.commit()
-        return jsonify({
-            'message': 'Booking cancelled successfully',
-            'booking': booking.to_dict()
-        }), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Cancellation failed'}), 500
+    
+    invalidate_search_results(booking.origin, booking.destination, booking.departure_date)
+    return jsonify({
+        'message': 'Booking cancelled successfully',
+        'booking': booking.to_dict()
+    }), 200
 
 @bookings_bp.route('/reference/<booking_ref>', methods=['GET'])
 def get_booking_by_reference(booking_ref):
     """Get booking by reference number (no auth required for lookup)"""
-    booking = Booking.query.filter_by(booking_reference=booking_ref).first()
+    try:
+        plan = BOOKING_FIELDS.project(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    booking = Booking.query.options(load_only(*plan.columns)).filter_by(booking_reference=booking_ref).first()
     
     if not booking:
         return jsonify({'error': 'Booking not found'}), 404
     
-    return jsonify({'booking': booking.to_dict()}), 200
+    return jsonify({'booking': plan.dump(booking)}), 200
@@ -1,76 +1,63 @@
-from flask import Blueprint, request, jsonify
-import random
+from flask import Blueprint, request, jsonify, current_app
+from models import Flight, FlightInstance
+from amadeus import SupplierError
+from payloads import StaticJSONPayload
+from airport_index import AirportIndex, MAX_SUGGESTIONS
+from internal import internal_only
+from inventory import (AIRLINES, AIRLINES_BY_CODE, MAX_FLEX_DAYS, MAX_PASSENGERS, MAX_SEARCH_RESULTS,
+                       find_flight_instances, normalize_airport_code)
 from datetime import datetime, timedelta
 
 flights_bp = Blueprint('flights', __name__)
 
-# Mock airlines data
-AIRLINES = [
-    {'name': 'SkyWings', 'code': 'SW', 'rating': 4.5},
-    {'name': 'AeroElite', 'code': 'AE', 'rating': 4.7},
-    {'name': 'CloudNine', 'code': 'CN', 'rating': 4.3},
-    {'name': 'JetStream', 'code': 'JS', 'rating': 4.6},
-    {'name': 'FlyHigh', 'code': 'FH', 'rating': 4.4},
-    {'name': 'Pacific Air', 'code': 'PA', 'rating': 4.8},
-    {'name': 'Continental Express', 'code': 'CE', 'rating': 4.2}
-]
+CLASS_MULTIPLIERS = {'economy': 1.0, 'business': 2.5, 'first': 4.0}
 
-def generate_flight_data(origin, destination, date, passengers=1):
-    """Generate mock flight data"""
-    flights = []
-    
-    for i in range(8):
-        airline = random.choice(AIRLINES)
-        
-        # Generate times
-        dep_hour = 6 + (i * 2)
-        dep_minute = random.choice([0, 30])
-        departure_time = f"{dep_hour:02d}:{dep_minute:02d}"
-        
-        # Duration between 2-8 hours
-        duration_hours = random.randint(2, 8)
-        duration_minutes = random.choice([0, 15, 30, 45])
-        duration = f"{duration_hours}h {duration_minutes}m"
-        
-        arr_hour = (dep_hour + duration_hours) % 24
-        arr_minute = (dep_minute + duration_minutes) % 60
-        arrival_time = f"{arr_hour:02d}:{arr_minute:02d}"
-        
-        # Price varies by distance and airline
-        base_price = random.randint(150, 500)
-        price = base_price + (passengers - 1) * (base_price * 0.8)
-        
-        flight = {
-            'id': f"{airline['code']}{1000 + i}",
-            'airline': airline['name'],
-            'airline_code': airline['code'],
-            'rating': airline['rating'],
-            'origin': origin,
-            'destination': destination,
-            'departure_time': departure_time,
-            'arrival_time': arrival_time,
-            'date': date,
-            'duration': duration,
-            'price': round(price, 2),
-            'stops': random.choice([0, 0, 0, 1]),  # Mostly non-stop
-            'seats_available': random.randint(10, 60),
-            'aircraft': random.choice(['Boeing 737', 'Airbus A320', 'Boeing 787', 'Airbus A350'])
-        }
-        
-        flights.append(flight)
-    
-    # Sort by price
-    flights.sort(key=lambda x: x['price'])
+AMENITIES = ['WiFi', 'In-flight Entertainment', 'Meals', 'Extra Legroom']
+BAGGAGE = {
+    'carry_on': '1 x 7kg',
+    'checked': '2 x 23kg'
+}
+
+SORT_OPTIONS = ['price', 'departure']
+
+def price_factor(passengers, class_type):
+    """Multiplier from base fare to total price for a party and cabin class"""
+    # Each extra passenger pays 80% of the base fare
+    return (1 + (passengers - 1) * 0.8) * CLASS_MULTIPLIERS.get(class_type, 1.0)
+
+def invalidate_search_results(origin, destination, departure_date):
+    """Drop cached searches for a route/date after its seat inventory changed
+
+    Called after the change is committed, so a cache failure is logged and
+    never fails the request (cached searches then age out by their TTL).
+    """
+    try:
+        current_app.extensions['search_cache'].invalidate(
+            normalize_airport_code(origin), normalize_airport_code(destination), departure_date)
+    except Exception:
+        current_app.logger.exception('Invalidating cached searches for %s-%s on %s failed',
+                                     origin, destination, departure_date)
+
+def flight_offer(instance, passengers=1, class_type='economy'):
+    """Build the search result for a flight instance"""
+    flight = instance.to_dict()
+    airline = AIRLINES_BY_CODE.get(flight['airline_code'])
+    price = instance.base_fare * price_factor(passengers, class_type)
     
-    return flights
+    flight.update({
+        'rating': airline['rating'] if airline else None,
+        'price': round(price, 2),
+        'class': class_type
+    })
+    del flight['base_fare']
+    return flight
 
 @flights_bp.route('/search', methods=['GET'])
 def search_flights():
     """Search for flights"""
-    origin = request.args.get('origin')
-    destination = request.args.get('destination')
+    origin = normalize_airport_code(request.args.get('origin'))
+    destination = normalize_airport_code(request.args.get('destination'))
     date = request.args.get('date')
-    passengers = int(request.args.get('passengers', 1))
     class_type = request.args.get('class', 'economy')
     
     # Validate required parameters
@@ -79,77 +66,239 @@ def search_flights():
     
     # Validate date format
     try:
-        datetime.strptime(date, '%Y-%m-%d')
+        departure_date = datetime.strptime(date, '%Y-%m-%d').date()
     except ValueError:
         return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
     
-    # Generate flight data
-    flights = generate_flight_data(origin, destination, date, passengers)
+    # Optional filters
+    try:
+        passengers = int(request.args.get('passengers', 1))
+        flex_days = int(request.args.get('flex_days', 0))
+        limit = int(request.args.get('limit', 50))
+        max_price = float(request.args['max_price']) if 'max_price' in request.args else None
+        max_stops = int(request.args['max_stops']) if 'max_stops' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Invalid numeric search filter'}), 400
+    sort = request.args.get('sort', 'price')
     
-    # Apply class pricing multiplier
-    multiplier = {'economy': 1.0, 'business': 2.5, 'first': 4.0}.get(class_type, 1.0)
-    for flight in flights:
-        flight['price'] = round(flight['price'] * multiplier, 2)
-        flight['class'] = class_type
+    if not 1 <= passengers <= MAX_PASSENGERS:
+        return jsonify({'error': f'passengers must be between 1 and {MAX_PASSENGERS}'}), 400
+    if not 0 <= flex_days <= MAX_FLEX_DAYS:
+        return jsonify({'error': f'flex_days must be between 0 and {MAX_FLEX_DAYS}'}), 400
+    if not 1 <= limit <= MAX_SEARCH_RESULTS:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SEARCH_RESULTS}'}), 400
+    if sort not in SORT_OPTIONS:
+        return jsonify({'error': f"sort must be one of: {', '.join(SORT_OPTIONS)}"}), 400
     
-    return jsonify({
+    # Identical searches are served from cache until their route/date changes
+    cache = current_app.extensions['search_cache']
+    singleflight = current_app.extensions['search_singleflight']
+    params = (origin, destination, departure_date, passengers, class_type,
+              flex_days, max_price, max_stops, sort, limit)
+    dates = [departure_date + timedelta(days=offset) for offset in range(-flex_days, flex_days + 1)]
+    # Read the route/date versions once, before searching: the result is
+    # stored under this key, so a booking that commits mid-search cannot
+    # have a pre-booking result filed under its post-booking version
+    key = cache.key(params, dates)
+    cached = cache.get(key)
+    # Searches only share a computation when they saw the same versions
+    flight_key = (params, key)
+    
+    if cached is not None:
+        result, age = cached
+        cache_status = 'HIT'
+        
+        # Stale supplier results are served now and refreshed in the background
+        if current_app.extensions.get('supplier') and age > current_app.config['SEARCH_FRESH_SECONDS']:
+            cache_status = 'STALE'
+            app = current_app._get_current_object()
+            
+            def refresh():
+                with app.app_context():
+                    singleflight.do(flight_key, lambda: run_search(params, dates, date, key))
+            
+            current_app.extensions['search_refresher'].refresh(params, refresh)
+    else:
+        # Concurrent identical misses share a single computation
+        try:
+            result = singleflight.do(flight_key, lambda: run_search(params, dates, date, key))
+        except SupplierError:
+            return jsonify({'error': 'Flight supplier unavailable'}), 502
+        age = 0
+        cache_status = 'MISS'
+    
+    response = jsonify(result)
+    response.headers['Age'] = str(int(age))
+    response.headers['X-Cache'] = cache_status
+    return response, 200
+
+def run_search(params, dates, date, key):
+    """Run a search against the inventory or supplier and cache the result under key"""
+    (origin, destination, departure_date, passengers, class_type,
+     flex_days, max_price, max_stops, sort, limit) = params
+    
+    supplier = current_app.extensions.get('supplier')
+    if supplier:
+        flights = search_supplier(supplier, origin, destination, dates, passengers,
+                                  class_type, max_price, max_stops, sort, limit)
+    else:
+        flights = search_inventory(origin, destination, departure_date, passengers,
+                                   class_type, flex_days, max_price, max_stops, sort, limit)
+    
+    result = {
         'flights': flights,
         'count': len(flights),
+        'source': 'amadeus' if supplier else 'inventory',
         'search_params': {
             'origin': origin,
             'destination': destination,
             'date': date,
             'passengers': passengers,
-            'class': class_type
+            'class': class_type,
+            'flex_days': flex_days,
+            'max_price': max_price,
+            'max_stops': max_stops,
+            'sort': sort
         }
-    }), 200
+    }
+    # Supplier results stay cached through their stale window
+    if supplier:
+        ttl = current_app.config['SEARCH_FRESH_SECONDS'] + current_app.config['SEARCH_STALE_SECONDS']
+    else:
+        ttl = current_app.config['SEARCH_CACHE_TTL']
+    current_app.extensions['search_cache'].set(key, result, ttl)
+    return result
+
+def search_inventory(origin, destination, departure_date, passengers, class_type,
+                     flex_days, max_price, max_stops, sort, limit):
+    """Search the local flight inventory"""
+    # Price ceiling is applied to the stored base fare so it runs in SQL
+    max_base_fare = None
+    if max_price is not None:
+        max_base_fare = max_price / price_factor(passengers, class_type)
+    
+    instances = find_flight_instances(origin, destination, departure_date, passengers,
+                                      flex_days=flex_days, max_base_fare=max_base_fare,
+                                      max_stops=max_stops, sort=sort, limit=limit)
+    return [flight_offer(instance, passengers, class_type) for instance in instances]
+
+def search_supplier(supplier, origin, destination, dates, passengers, class_type,
+                    max_price, max_stops, sort, limit):
+    """Search live supplier offers, querying every date concurrently"""
+    flights = supplier.search(origin, destination, dates, adults=passengers,
+                              class_type=class_type, non_stop=max_stops == 0,
+                              max_price=max_price)
+    
+    if max_price is not None:
+        flights = [f for f in flights if f['price'] <= max_price]
+    if max_stops is not None:
+        flights = [f for f in flights if f['stops'] <= max_stops]
+    
+    if sort == 'departure':
+        flights.sort(key=lambda f: (f['date'], f['departure_time']))
+    else:
+        flights.sort(key=lambda f: (f['price'], f['date'], f['departure_time']))
+    return flights[:limit]
+
+@flights_bp.route('/search/stats', methods=['GET'])
+@internal_only
+def search_stats():
+    """Search cache and request coalescing counters"""
+    stats = {
+        'search_cache': current_app.extensions['search_cache'].stats(),
+        'coalescing': current_app.extensions['search_singleflight'].stats(),
+        'background_refresh': current_app.extensions['search_refresher'].stats()
+    }
+    supplier = current_app.extensions.get('supplier')
+    if supplier:
+        stats['supplier'] = supplier.stats()
+    return jsonify(stats), 200
 
 @flights_bp.route('/<flight_id>', methods=['GET'])
 def get_flight_details(flight_id):
-    """Get details of a specific flight"""
-    # In a real application, this would query a database
-    # For now, return mock data
-    
-    airline_code = flight_id[:2]
-    airline = next((a for a in AIRLINES if a['code'] == airline_code), AIRLINES[0])
-    
-    flight = {
-        'id': flight_id,
-        'airline': airline['name'],
-        'airline_code': airline['code'],
-        'rating': airline['rating'],
-        'departure_time': '10:30',
-        'arrival_time': '14:45',
-        'duration': '4h 15m',
-        'price': 299.99,
-        'stops': 0,
-        'seats_available': 24,
-        'aircraft': 'Boeing 737',
-        'amenities': ['WiFi', 'In-flight Entertainment', 'Meals', 'Extra Legroom'],
-        'baggage': {
-            'carry_on': '1 x 7kg',
-            'checked': '2 x 23kg'
-        }
-    }
+    """Get details of a specific flight (optionally on a given ?date=)"""
+    flight = Flight.query.filter_by(flight_number=flight_id).first()
+    
+    if not flight:
+        return jsonify({'error': 'Flight not found'}), 404
+    
+    # Without a date, show the next upcoming departure
+    instances = flight.instances.order_by(FlightInstance.departure_date)
+    date = request.args.get('date')
+    if date:
+        try:
+            departure_date = datetime.strptime(date, '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        instance = instances.filter(FlightInstance.departure_date == departure_date).first()
+        if not instance:
+            return jsonify({'error': 'Flight does not operate on this date'}), 404
+    else:
+        instance = instances.filter(FlightInstance.departure_date >= datetime.utcnow().date()).first()
+    
+    if instance:
+        details = flight_offer(instance)
+    else:
+        details = flight.to_dict()
+        airline = AIRLINES_BY_CODE.get(flight.airline_code)
+        details['rating'] = airline['rating'] if airline else None
+    
+    details.update({
+        'amenities': AMENITIES,
+        'baggage': BAGGAGE
+    })
     
-    return jsonify({'flight': flight}), 200
+    return jsonify({'flight': details}), 200
+
+# Reference data only changes on deploy: encode it once and serve it with ETags
+AIRPORTS = [
+    {'code': 'JFK', 'name': 'John F. Kennedy International', 'city': 'New York', 'country': 'USA'},
+    {'code': 'LHR', 'name': 'London Heathrow', 'city': 'London', 'country': 'UK'},
+    {'code': 'NRT', 'name': 'Narita International', 'city': 'Tokyo', 'country': 'Japan'},
+    {'code': 'DXB', 'name': 'Dubai International', 'city': 'Dubai', 'country': 'UAE'},
+    {'code': 'SIN', 'name': 'Singapore Changi', 'city': 'Singapore', 'country': 'Singapore'},
+    {'code': 'CDG', 'name': 'Charles de Gaulle', 'city': 'Paris', 'country': 'France'},
+    {'code': 'LAX', 'name': 'Los Angeles International', 'city': 'Los Angeles', 'country': 'USA'},
+    {'code': 'SYD', 'name': 'Sydney Airport', 'city': 'Sydney', 'country': 'Australia'},
+    {'code': 'HKG', 'name': 'Hong Kong International', 'city': 'Hong Kong', 'country': 'China'},
+    {'code': 'FRA', 'name': 'Frankfurt Airport', 'city': 'Frankfurt', 'country': 'Germany'},
+    {'code': 'YYZ', 'name': 'Toronto Pearson', 'city': 'Toronto', 'country': 'Canada'},
+    {'code': 'BOM', 'name': 'Chhatrapati Shivaji Maharaj International', 'city': 'Mumbai', 'country': 'India'}
+]
+
+AIRPORTS_PAYLOAD = StaticJSONPayload({'airports': AIRPORTS})
+AIRLINES_PAYLOAD = StaticJSONPayload({'airlines': AIRLINES})
+
+# Every IATA airport, for autocomplete; the airports we fly rank first
+AIRPORT_INDEX = AirportIndex.from_csv(featured=[airport['code'] for airport in AIRPORTS])
 
 @flights_bp.route('/airports', methods=['GET'])
 def get_airports():
     """Get list of available airports"""
-    airports = [
-        {'code': 'JFK', 'name': 'John F. Kennedy International', 'city': 'New York', 'country': 'USA'},
-        {'code': 'LHR', 'name': 'London Heathrow', 'city': 'London', 'country': 'UK'},
-        {'code': 'NRT', 'name': 'Narita International', 'city': 'Tokyo', 'country': 'Japan'},
-        {'code': 'DXB', 'name': 'Dubai International', 'city': 'Dubai', 'country': 'UAE'},
-        {'code': 'SIN', 'name': 'Singapore Changi', 'city': 'Singapore', 'country': 'Singapore'},
-        {'code': 'CDG', 'name': 'Charles de Gaulle', 'city': 'Paris', 'country': 'France'},
-        {'code': 'LAX', 'name': 'Los Angeles International', 'city': 'Los Angeles', 'country': 'USA'},
-        {'code': 'SYD', 'name': 'Sydney Airport', 'city': 'Sydney', 'country': 'Australia'},
-        {'code': 'HKG', 'name': 'Hong Kong International', 'city': 'Hong Kong', 'country': 'China'},
-        {'code': 'FRA', 'name': 'Frankfurt Airport', 'city': 'Frankfurt', 'country': 'Germany'},
-        {'code': 'YYZ', 'name': 'Toronto Pearson', 'city': 'Toronto', 'country': 'Canada'},
-        {'code': 'BOM', 'name': 'Chhatrapati Shivaji Maharaj International', 'city': 'Mumbai', 'country': 'India'}
-    ]
-    
-    return jsonify({'airports': airports}), 200
+    return AIRPORTS_PAYLOAD.response()
+
+@flights_bp.route('/airports/suggest', methods=['GET'])
+def suggest_airports():
+    """Autocomplete airports by code, city, name or country prefix"""
+    query = request.args.get('q', '').strip()
+    
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    
+    if not 1 <= limit <= MAX_SUGGESTIONS:
+        return jsonify({'error': f'limit must be between 1 and {MAX_SUGGESTIONS}'}), 400
+    
+    suggestions = AIRPORT_INDEX.suggest(query, limit)
+    
+    return jsonify({
+        'query': query,
+        'suggestions': suggestions,
+        'count': len(suggestions)
+    }), 200
+
+@flights_bp.route('/airlines', methods=['GET'])
+def get_airlines():
+    """Get list of airlines"""
+    return AIRLINES_PAYLOAD.response()
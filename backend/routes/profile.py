@@ -1,5 +1,5 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
 from models import db, User
 from datetime import datetime
 
@@ -9,13 +9,8 @@ profile_bp = Blueprint('profile', __name__)
 @jwt_required()
 def get_profile():
     """Get user profile"""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    return jsonify({'profile': user.to_dict()}), 200
+    # Cached snapshot loaded during JWT verification (see user_cache.py)
+    return jsonify({'profile': get_current_user()}), 200
 
 @profile_bp.route('', methods=['PUT'])
 @jwt_required()
@@ -45,6 +40,7 @@ def update_profile():
     
     try:
         db.session.commit()
+        current_app.extensions['user_cache'].invalidate(user_id)
         return jsonify({
             'message': 'Profile updated successfully',
             'profile': user.to_dict()
@@ -78,6 +74,7 @@ def change_password():
     
     try:
         db.session.commit()
+        current_app.extensions['user_cache'].invalidate(user_id)
         return jsonify({'message': 'Password changed successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -1,17 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
-from models import db, SupportTicket
+from models import db, SupportTicket, TICKET_FIELDS
+from sqlalchemy.orm import load_only
+from payloads import StaticJSONPayload
+from pagination import InvalidCursor, page_size, paginate
+from idempotency import idempotent
 from datetime import datetime
-import random
-import string
 
 support_bp = Blueprint('support', __name__)
 
 def generate_ticket_number():
-    """Generate unique ticket number"""
-    return 'TKT' + ''.join(random.choices(string.digits, k=5))
+    """Generate unique ticket number (see identifiers.py)"""
+    return current_app.extensions['ticket_numbers'].next()
 
 @support_bp.route('/tickets', methods=['POST'])
+@idempotent('tickets')
 def create_ticket():
     """Create a support ticket (auth optional)"""
     data = request.get_json()
@@ -37,8 +40,6 @@ def create_ticket():
     
     # Generate ticket number
     ticket_num = generate_ticket_number()
-    while SupportTicket.query.filter_by(ticket_number=ticket_num).first():
-        ticket_num = generate_ticket_number()
     
     # Create ticket
     ticket = SupportTicket(
@@ -65,25 +66,38 @@ def create_ticket():
         db.session.rollback()
         return jsonify({'error': 'Ticket creation failed'}), 500
 
+def tickets_list_query(user_id, status=None, plan=TICKET_FIELDS):
+    """A user's tickets as plain column tuples (the plan's fields plus the cursor key)
+
+    A read-only list needs no ORM identity map. tools/check_query_plans.py
+    EXPLAINs this same query.
+    """
+    query = SupportTicket.query.filter_by(user_id=user_id)
+    if status:
+        query = query.filter_by(status=status)
+    return query.with_entities(*plan.select_columns(SupportTicket.created_at, SupportTicket.id))
+
 @support_bp.route('/tickets', methods=['GET'])
 @jwt_required()
 def get_user_tickets():
-    """Get all tickets for current user"""
+    """Get the current user's tickets, newest first, one page at a time"""
     user_id = get_jwt_identity()
     
-    # Get query parameters
-    status = request.args.get('status')
-    
-    query = SupportTicket.query.filter_by(user_id=user_id)
-    
-    if status:
-        query = query.filter_by(status=status)
-    
-    tickets = query.order_by(SupportTicket.created_at.desc()).all()
+    try:
+        plan = TICKET_FIELDS.project(request.args.get('fields'))
+        limit = page_size(request.args.get('limit'))
+        query = tickets_list_query(user_id, request.args.get('status'), plan)
+        rows, next_cursor = paginate(query, SupportTicket, request.args.get('cursor'), limit)
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'tickets': [ticket.to_dict() for ticket in tickets],
-        'count': len(tickets)
+        'tickets': plan.dump_rows(rows),
+        'count': len(rows),
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
     }), 200
 
 @support_bp.route('/tickets/<int:ticket_id>', methods=['GET'])
@@ -92,12 +106,17 @@ def get_ticket(ticket_id):
     """Get specific ticket details"""
     user_id = get_jwt_identity()
     
-    ticket = SupportTicket.query.filter_by(id=ticket_id, user_id=user_id).first()
+    try:
+        plan = TICKET_FIELDS.project(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    ticket = SupportTicket.query.options(load_only(*plan.columns)).filter_by(id=ticket_id, user_id=user_id).first()
     
     if not ticket:
         return jsonify({'error': 'Ticket not found'}), 404
     
-    return jsonify({'ticket': ticket.to_dict()}), 200
+    return jsonify({'ticket': plan.dump(ticket)}), 200
 
 @support_bp.route('/tickets/<int:ticket_id>', methods=['PUT'])
 @jwt_required()
@@ -130,51 +149,64 @@ def update_ticket(ticket_id):
 @support_bp.route('/tickets/number/<ticket_num>', methods=['GET'])
 def get_ticket_by_number(ticket_num):
     """Get ticket by ticket number (no auth required for lookup)"""
-    ticket = SupportTicket.query.filter_by(ticket_number=ticket_num).first()
+    try:
+        plan = TICKET_FIELDS.project(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    ticket = SupportTicket.query.options(load_only(*plan.columns)).filter_by(ticket_number=ticket_num).first()
     
     if not ticket:
         return jsonify({'error': 'Ticket not found'}), 404
     
-    return jsonify({'ticket': ticket.to_dict()}), 200
+    return jsonify({'ticket': plan.dump(ticket)}), 200
+
+# FAQ content only changes on deploy: encode each category once and serve it with ETags
+FAQS = [
+    {
+        'id': 1,
+        'question': 'How do I cancel my booking?',
+        'answer': 'You can cancel your booking from the "My Bookings" page. Click on the "Cancel Booking" button next to your reservation. Cancellation fees may apply based on the airline\'s policy.',
+        'category': 'bookings'
+    },
+    {
+        'id': 2,
+        'question': 'What payment methods do you accept?',
+        'answer': 'We accept all major credit cards (Visa, MasterCard, American Express), debit cards, and PayPal. All transactions are secured with 256-bit encryption.',
+        'category': 'payments'
+    },
+    {
+        'id': 3,
+        'question': 'Can I change my flight date?',
+        'answer': 'Yes, flight date changes are subject to availability and airline policies. Additional charges may apply. Contact our support team for assistance.',
+        'category': 'bookings'
+    },
+    {
+        'id': 4,
+        'question': 'How early should I arrive at the airport?',
+        'answer': 'We recommend arriving at least 2 hours before domestic flights and 3 hours before international flights to allow time for check-in and security procedures.',
+        'category': 'travel'
+    },
+    {
+        'id': 5,
+        'question': 'What is your refund policy?',
+        'answer': 'Refund policies vary by airline and ticket type. Fully refundable tickets can be cancelled with a full refund, while non-refundable tickets may incur cancellation fees.',
+        'category': 'refunds'
+    }
+]
+
+def _faq_payload(faqs):
+    return StaticJSONPayload({'faqs': faqs, 'count': len(faqs)})
+
+FAQ_PAYLOADS = {
+    category: _faq_payload([faq for faq in FAQS if faq['category'] == category])
+    for category in {faq['category'] for faq in FAQS}
+}
+FAQ_PAYLOADS[None] = _faq_payload(FAQS)
+EMPTY_FAQ_PAYLOAD = _faq_payload([])
 
 @support_bp.route('/faq', methods=['GET'])
 def get_faq():
     """Get FAQ items"""
-    faqs = [
-        {
-            'id': 1,
-            'question': 'How do I cancel my booking?',
-            'answer': 'You can cancel your booking from the "My Bookings" page. Click on the "Cancel Booking" button next to your reservation. Cancellation fees may apply based on the airline\'s policy.',
-            'category': 'bookings'
-        },
-        {
-            'id': 2,
-            'question': 'What payment methods do you accept?',
-            'answer': 'We accept all major credit cards (Visa, MasterCard, American Express), debit cards, and PayPal. All transactions are secured with 256-bit encryption.',
-            'category': 'payments'
-        },
-        {
-            'id': 3,
-            'question': 'Can I change my flight date?',
-            'answer': 'Yes, flight date changes are subject to availability and airline policies. Additional charges may apply. Contact our support team for assistance.',
-            'category': 'bookings'
-        },
-        {
-            'id': 4,
-            'question': 'How early should I arrive at the airport?',
-            'answer': 'We recommend arriving at least 2 hours before domestic flights and 3 hours before international flights to allow time for check-in and security procedures.',
-            'category': 'travel'
-        },
-        {
-            'id': 5,
-            'question': 'What is your refund policy?',
-            'answer': 'Refund policies vary by airline and ticket type. Fully refundable tickets can be cancelled with a full refund, while non-refundable tickets may incur cancellation fees.',
-            'category': 'refunds'
-        }
-    ]
-    
-    category = request.args.get('category')
-    if category:
-        faqs = [faq for faq in faqs if faq['category'] == category]
-    
-    return jsonify({'faqs': faqs, 'count': len(faqs)}), 200
+    category = request.args.get('category') or None
+    return FAQ_PAYLOADS.get(category, EMPTY_FAQ_PAYLOAD).response()
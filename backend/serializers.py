@@ -0,0 +1,107 @@
+"""Fast serialization of model rows for JSON responses
+
+A FieldPlan is built once per model: the ordered field names, the mapped
+columns to select and which of them hold dates. Serializing an instance is
+one attrgetter call and a dict(zip()), and read-only list endpoints can skip
+the ORM entirely by selecting plan.columns and dumping the row tuples.
+
+When orjson is installed and FAST_JSON is on, OrJSONProvider replaces
+Flask's stdlib JSON encoder for every jsonify() response.
+"""
+import operator
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime
+
+try:
+    import orjson
+except ImportError:  # optional dependency, the stdlib encoder is used without it
+    orjson = None
+
+# Projections remembered per plan (clients choose the subsets, so keep it bounded)
+MAX_PROJECTIONS = 64
+
+class FieldPlan:
+    """Precompiled field list for serializing one model"""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        self._projections = {}
+        self.columns = tuple(getattr(model, field) for field in self.fields)
+        getter = operator.attrgetter(*self.fields)
+        self._get = getter if len(self.fields) > 1 else lambda obj: (getter(obj),)
+        self._dates = tuple(field for field, column in zip(self.fields, self.columns)
+                            if isinstance(column.type, (Date, DateTime)))
+
+    def project(self, fields):
+        """Plan for a comma-separated subset of fields (this plan if fields is empty)
+
+        Fields keep this plan's order; unknown names raise ValueError.
+        """
+        requested = {field.strip() for field in (fields or '').split(',') if field.strip()}
+        if not requested:
+            return self
+        unknown = requested.difference(self.fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        key = tuple(field for field in self.fields if field in requested)
+        plan = self._projections.get(key)
+        if plan is None:
+            plan = FieldPlan(self.model, key)
+            if len(self._projections) < MAX_PROJECTIONS:
+                self._projections[key] = plan
+        return plan
+
+    def select_columns(self, *extra):
+        """plan.columns followed by any extra columns it does not already include
+
+        Rows selected this way still dump correctly, since dump_rows ignores
+        trailing values.
+        """
+        return self.columns + tuple(column for column in extra if column.key not in self.fields)
+
+    def _to_dict(self, values):
+        data = dict(zip(self.fields, values))
+        for field in self._dates:
+            value = data[field]
+            if value is not None:
+                data[field] = value.isoformat()
+        return data
+
+    def dump(self, obj):
+        """Dictionary for a model instance"""
+        return self._to_dict(self._get(obj))
+
+    def dump_rows(self, rows):
+        """Dictionaries for row tuples selected with plan.columns"""
+        to_dict = self._to_dict
+        return [to_dict(row) for row in rows]
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson
+
+    Output matches the default provider except that keys keep their
+    insertion order: datetimes, decimals and dataclasses still go through
+    Flask's default() hook.
+    """
+
+    def _dumps(self, obj):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        return orjson.dumps(obj, default=self.default, option=options)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps(obj) + b'\n', mimetype=self.mimetype)
+
+def create_json_provider(app):
+    """orjson provider when FAST_JSON is on and orjson is installed, else None"""
+    if not app.config.get('FAST_JSON') or orjson is None:
+        return None
+    return OrJSONProvider(app)
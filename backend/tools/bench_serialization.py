@@ -0,0 +1,131 @@
+"""Benchmark booking list serialization: to_dict() vs field plans vs orjson
+
+Run from backend/:
+
+    python tools/bench_serialization.py
+    python tools/bench_serialization.py --rows 20000 --sizes 20 100 1000 10000
+
+Loads --rows bookings for one user into an in-memory SQLite database, then
+times producing a JSON response body for the newest N bookings four ways:
+
+  legacy to_dict      ORM objects, the original hand-written to_dict(), stdlib json
+  plan, ORM           ORM objects, FieldPlan.dump(), stdlib json
+  plan, columns       column tuples, FieldPlan.dump_rows(), stdlib json
+  plan, columns, orjson   as above, encoded by OrJSONProvider (if installed)
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=30)
+    return parser.parse_args()
+
+def legacy_to_dict(booking):
+    """Booking.to_dict() as it was before field plans"""
+    return {
+        'id': booking.id,
+        'booking_reference': booking.booking_reference,
+        'flight_id': booking.flight_id,
+        'airline': booking.airline,
+        'origin': booking.origin,
+        'destination': booking.destination,
+        'departure_time': booking.departure_time,
+        'arrival_time': booking.arrival_time,
+        'departure_date': booking.departure_date.isoformat(),
+        'duration': booking.duration,
+        'passengers': booking.passengers,
+        'class_type': booking.class_type,
+        'price': booking.price,
+        'total_price': booking.total_price,
+        'status': booking.status,
+        'passenger_name': booking.passenger_name,
+        'passenger_email': booking.passenger_email,
+        'passenger_phone': booking.passenger_phone,
+        'created_at': booking.created_at.isoformat(),
+        'updated_at': booking.updated_at.isoformat()
+    }
+
+def populate(db, rows):
+    from sqlalchemy import insert
+    from models import User, Booking
+
+    with db.engine.begin() as conn:
+        conn.execute(insert(User), [{'email': 'corp@example.com', 'password_hash': 'x', 'name': 'Corp'}])
+        start = datetime(2026, 1, 1)
+        conn.execute(insert(Booking), [{
+            'user_id': 1, 'booking_reference': f'BK{n:08d}', 'flight_id': f'AE{n % 900 + 100}',
+            'airline': 'AeroElite', 'origin': 'JFK', 'destination': 'LHR',
+            'departure_time': '08:00', 'arrival_time': '20:15', 'departure_date': date(2027, 1, 1),
+            'duration': '7h 15m', 'passengers': 1 + n % 4, 'class_type': 'economy',
+            'price': 512.5, 'total_price': 512.5 * (1 + n % 4), 'status': 'confirmed',
+            'passenger_name': 'Alex Traveller', 'passenger_email': 'alex@example.com',
+            'passenger_phone': '+1 555 0100', 'created_at': start + timedelta(minutes=n),
+            'updated_at': start + timedelta(minutes=n)
+        } for n in range(rows)])
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = 'sqlite://'
+
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app
+    from models import db, Booking, BOOKING_FIELDS
+    from serializers import OrJSONProvider, orjson
+
+    app = create_app('production')
+    stdlib_json = DefaultJSONProvider(app)
+    fast_json = OrJSONProvider(app) if orjson is not None else None
+
+    with app.app_context():
+        populate(db, args.rows)
+        newest = Booking.query.filter_by(user_id=1).order_by(Booking.created_at.desc(), Booking.id.desc())
+
+        def orm(limit):
+            objects = newest.limit(limit).all()
+            db.session.expunge_all()
+            return objects
+
+        variants = {
+            'legacy to_dict': lambda limit: stdlib_json.dumps(
+                {'bookings': [legacy_to_dict(b) for b in orm(limit)]}),
+            'plan, ORM': lambda limit: stdlib_json.dumps(
+                {'bookings': [BOOKING_FIELDS.dump(b) for b in orm(limit)]}),
+            'plan, columns': lambda limit: stdlib_json.dumps(
+                {'bookings': BOOKING_FIELDS.dump_rows(newest.with_entities(*BOOKING_FIELDS.columns).limit(limit).all())}),
+        }
+        if fast_json:
+            variants['plan, columns, orjson'] = lambda limit: fast_json.dumps(
+                {'bookings': BOOKING_FIELDS.dump_rows(newest.with_entities(*BOOKING_FIELDS.columns).limit(limit).all())})
+        else:
+            print('orjson is not installed; skipping the orjson variant')
+
+        sizes = [size for size in args.sizes if size <= args.rows]
+        print(f"{'rows':<24}" + ''.join(f'{size:>18}' for size in sizes))
+        baseline = {}
+        for name, fn in variants.items():
+            cells = []
+            for size in sizes:
+                ms = timed(lambda: fn(size), args.repeat)
+                baseline.setdefault(size, ms)
+                cells.append(f'{ms:.2f}ms ({baseline[size] / ms:.1f}x)')
+            print(f'{name:<24}' + ''.join(f'{cell:>18}' for cell in cells))
+
+if __name__ == '__main__':
+    main()
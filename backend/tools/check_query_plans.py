@@ -0,0 +1,133 @@
+"""Check that the booking and ticket listing queries never sort
+
+Run from backend/ (exits non-zero on a regression, so it can gate CI):
+
+    python tools/check_query_plans.py
+    python tools/check_query_plans.py --rows 200000 --database-url sqlite:///plans.db
+
+Loads users with bookings and support tickets into a scratch SQLite database,
+runs ANALYZE so the planner sees realistic statistics, then EXPLAINs the
+queries built by the same helpers the endpoints call
+(bookings_list_query, tickets_list_query and bookings_export_statement).
+It covers the first page and a cursor page, with and without a status
+filter, for all fields and for a narrow ?fields= projection, plus the
+booking export. Every plan must read one of the composite
+(user_id[, status], created_at, id) indexes and must not contain a
+"USE TEMP B-TREE FOR ORDER BY" step.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000, help='bookings (and tickets) to generate')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--database-url', default='sqlite://', help='SQLite URL (default: in memory)')
+    return parser.parse_args()
+
+def populate(db, args):
+    """Bulk load users, bookings and tickets with skewed per-user counts"""
+    from sqlalchemy import insert
+    from models import User, Booking, SupportTicket
+
+    rng = random.Random(3)
+    start = datetime(2026, 1, 1)
+    with db.engine.begin() as conn:
+        conn.execute(insert(User), [
+            {'email': f'user{i}@example.com', 'password_hash': 'x', 'name': f'User {i}'}
+            for i in range(args.users)
+        ])
+
+    # A few corporate accounts own most rows, like production
+    weights = [50 if i < 5 else 1 for i in range(args.users)]
+    user_ids = rng.choices(range(1, args.users + 1), weights=weights, k=args.rows)
+    bookings, tickets = [], []
+    for n, user_id in enumerate(user_ids):
+        created_at = start + timedelta(seconds=rng.randrange(365 * 86400))
+        bookings.append({
+            'user_id': user_id, 'booking_reference': f'BK{n:08d}', 'flight_id': 'AE100',
+            'airline': 'AeroElite', 'origin': 'JFK', 'destination': 'LHR',
+            'departure_time': '08:00', 'arrival_time': '20:00', 'departure_date': date(2027, 1, 1),
+            'passengers': 1, 'class_type': 'economy', 'price': 500, 'total_price': 500,
+            'status': rng.choice(['confirmed', 'confirmed', 'confirmed', 'cancelled']),
+            'passenger_name': 'Test', 'passenger_email': 't@example.com', 'passenger_phone': '1',
+            'created_at': created_at
+        })
+        tickets.append({
+            'user_id': user_id, 'ticket_number': f'TKT{n:08d}', 'subject': 'Help',
+            'description': 'Help', 'priority': 'medium',
+            'status': rng.choice(['open', 'in_progress', 'resolved', 'closed']),
+            'created_at': created_at
+        })
+    with db.engine.begin() as conn:
+        conn.execute(insert(Booking), bookings)
+        conn.execute(insert(SupportTicket), tickets)
+        conn.exec_driver_sql('ANALYZE')
+
+def explain(db, query):
+    """SQLite EXPLAIN QUERY PLAN rows for an ORM query or a select()"""
+    statement = getattr(query, 'statement', query).compile(dialect=db.engine.dialect)
+    params = tuple(statement.params[name] for name in statement.positiontup)
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', params).all()
+    return [row[-1] for row in rows]
+
+def main():
+    args = parse_args()
+    if not args.database_url.startswith('sqlite'):
+        sys.exit('check_query_plans.py only reads SQLite query plans')
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from app import create_app
+    from models import db, Booking, SupportTicket, BOOKING_FIELDS, TICKET_FIELDS
+    from pagination import encode_cursor, page_query
+    from routes.bookings import bookings_export_statement, bookings_list_query
+    from routes.support import tickets_list_query
+
+    app = create_app('production')
+
+    failures = 0
+    with app.app_context():
+        db.create_all()
+        if not Booking.query.first():
+            populate(db, args)
+
+        cursor = encode_cursor(datetime(2026, 7, 1), 10 ** 9)
+        listings = (
+            (Booking, bookings_list_query, 'confirmed', BOOKING_FIELDS, 'booking_reference,status'),
+            (SupportTicket, tickets_list_query, 'open', TICKET_FIELDS, 'ticket_number,status')
+        )
+        cases = []
+        for model, list_query, status, fields, narrow in listings:
+            for plan_name, plan in (('', fields), (' narrow', fields.project(narrow))):
+                for with_status in (False, True):
+                    for page_cursor in (None, cursor):
+                        query = list_query(1, status if with_status else None, plan)
+                        name = (f"{model.__tablename__}{plan_name}{' status' if with_status else ''}"
+                                f"{' cursor page' if page_cursor else ' first page'}")
+                        cases.append((name, model, page_query(query, model, page_cursor, 20)))
+        for with_status in (False, True):
+            cases.append((f"bookings export{' status' if with_status else ''}", Booking,
+                          bookings_export_statement(1, 'confirmed' if with_status else None)))
+
+        for name, model, query in cases:
+            plan = explain(db, query)
+            expected = {index.name for index in model.__table__.indexes
+                        if index.name.endswith('_created') and len(index.columns) > 2}
+            uses_index = any(index_name in step for step in plan for index_name in expected)
+            sorts = any('TEMP B-TREE' in step for step in plan)
+            ok = uses_index and not sorts
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {' | '.join(plan)}")
+
+    if failures:
+        sys.exit(f'{failures} listing queries do not use an ordered composite index')
+    print('All listing queries read rows in index order')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Check that every rate limit bucket store really limits
+
+Run from backend/:
+
+    python tools/check_rate_limits.py
+    python tools/check_rate_limits.py --workers 4
+
+For each store (memory, the shared SQLite cache file and the shared Redis
+cache, served by tools/fake_redis.py) it sends one client's booking lookups
+round-robin through --workers limiters, like requests spread over gunicorn
+workers. The shared stores must answer 429 with Retry-After once the burst
+of the route's limit is spent, whichever worker takes the request; the
+memory store gives each worker its own burst. A store that errors fails the
+check, since the limiter lets requests through when its store is down.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINT = 'bookings.get_booking_by_reference'
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2, help='limiters sharing each store')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    scratch = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(scratch, "ratelimit.db")}'
+    os.environ['HOLD_SWEEP_INTERVAL'] = '0'
+
+    from app import create_app
+    from cache import create_cache_backend
+    from ratelimit import RateLimiter, create_bucket_store, parse_limit
+    from fake_redis import FakeRedisServer
+
+    app = create_app('production')
+    app.config['RATELIMIT_ENABLED'] = True
+    burst = parse_limit(app.config['RATE_LIMITS'][ENDPOINT])[1]
+    redis = FakeRedisServer(port=0).start()
+    stores = [
+        ('memory', {'CACHE_BACKEND': 'memory', 'RATELIMIT_STORAGE': 'memory'}, burst * args.workers),
+        ('sqlite', {'CACHE_BACKEND': 'sqlite', 'CACHE_URL': os.path.join(scratch, 'cache.db'),
+                    'RATELIMIT_STORAGE': 'shared'}, burst),
+        ('redis', {'CACHE_BACKEND': 'redis', 'CACHE_URL': redis.url, 'RATELIMIT_STORAGE': 'shared'}, burst)
+    ]
+
+    failures = []
+    client = app.test_client()
+    for label, settings, expected in stores:
+        config = {**app.config, **settings}
+        limiters = [RateLimiter(create_bucket_store(config, create_cache_backend(config)), app.config['RATE_LIMITS'])
+                    for _ in range(args.workers)]
+        served, retry_after = 0, None
+        for n in range(expected + args.workers):
+            app.extensions['rate_limiter'] = limiters[n % args.workers]
+            response = client.get('/api/bookings/reference/BKNOTREAL')
+            if response.status_code == 429:
+                retry_after = retry_after or response.headers.get('Retry-After')
+            else:
+                served += 1
+        errors = sum(limiter.errors for limiter in limiters)
+        print(f'{label:<7} {served} of {expected + args.workers} served (expected {expected}), '
+              f'Retry-After {retry_after}, store errors {errors}')
+        if errors or served != expected or not retry_after:
+            failures.append(label)
+
+    redis.shutdown()
+    if failures:
+        sys.exit(f'FAILED: {", ".join(failures)} did not limit as configured')
+    print('OK')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Compare threaded WSGI (gunicorn gthread) with ASGI (uvicorn) serving
+
+Run from backend/ (needs gunicorn, uvicorn and aiohttp):
+
+    python tools/compare_servers.py
+    python tools/compare_servers.py --connections 1000 --duration 15 --workers 4 --threads 8
+
+Seeds a temporary database, then for each mode starts the server as a
+subprocess with the same worker and thread counts. It opens --connections
+concurrent keep-alive connections and sends requests for --duration
+seconds. Half are flight searches (cached after the first) and half are
+booking lookups by reference. Reports requests per second, latency and
+errors (refused connections, timeouts and non-2xx responses).
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per mode')
+    parser.add_argument('--workers', type=int, default=2, help='server worker processes')
+    parser.add_argument('--threads', type=int, default=8, help='request threads per worker')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request timeout (seconds)')
+    return parser.parse_args()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def seed(env):
+    """Seed flights and bookings; returns (search path, booking references)"""
+    os.environ.update(env)
+    from app import create_app
+    from models import db, User, Booking
+    from inventory import seed_flights
+
+    app = create_app('production')
+    departure_date = date.today() + timedelta(days=7)
+    with app.app_context():
+        seed_flights(days=14, flights_per_route=2)
+        references = app.extensions['booking_references'].next_many(200)
+        user = User(email='load@example.com', name='Load Test', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([Booking(
+            user_id=user.id, booking_reference=reference, flight_id='AE100', airline='AeroElite',
+            origin='JFK', destination='LHR', departure_time='08:00', arrival_time='20:00',
+            departure_date=departure_date, passengers=1, class_type='economy', price=500,
+            total_price=500, passenger_name='Load Test', passenger_email='load@example.com',
+            passenger_phone='+1 555 0100', status='confirmed'
+        ) for reference in references])
+        db.session.commit()
+    search = f'/api/flights/search?origin=JFK&destination=LHR&date={departure_date.isoformat()}'
+    return search, references
+
+def server_command(mode, port, args):
+    if mode == 'wsgi':
+        return ['gunicorn', "app:create_app('production')", '--bind', f'127.0.0.1:{port}',
+                '--workers', str(args.workers), '--worker-class', 'gthread', '--threads', str(args.threads),
+                '--backlog', '2048', '--log-level', 'warning']
+    return ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port), '--workers', str(args.workers),
+            '--backlog', '2048', '--no-access-log', '--log-level', 'warning']
+
+def wait_for(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+async def load(base_url, paths, args):
+    import aiohttp
+
+    latencies = []
+    outcomes = Counter()
+    deadline = time.monotonic() + args.duration
+    connector = aiohttp.TCPConnector(limit=args.connections, force_close=False)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def connection(n):
+            rng = random.Random(n)
+            while time.monotonic() < deadline:
+                began = time.perf_counter()
+                try:
+                    async with session.get(base_url + rng.choice(paths)) as response:
+                        await response.read()
+                        outcomes[response.status] += 1
+                        if response.status < 300:
+                            latencies.append((time.perf_counter() - began) * 1000)
+                except asyncio.TimeoutError:
+                    outcomes['timeout'] += 1
+                except aiohttp.ClientError as e:
+                    outcomes[type(e).__name__] += 1
+                    await asyncio.sleep(0.05)
+
+        began = time.perf_counter()
+        await asyncio.gather(*(connection(n) for n in range(args.connections)))
+        elapsed = time.perf_counter() - began
+    return latencies, outcomes, elapsed
+
+def main():
+    args = parse_args()
+    scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    env = {
+        'DATABASE_URL': f'sqlite:///{scratch.name}',
+        'RATELIMIT_ENABLED': 'false',  # one client IP would exhaust the lookup limits
+        'ASGI_THREADS': str(args.threads)
+    }
+    search, references = seed(env)
+    paths = [search] * len(references) + [f'/api/bookings/reference/{reference}' for reference in references]
+
+    print(f'{args.connections} concurrent connections, {args.workers} workers x {args.threads} threads, '
+          f'{args.duration:g}s per mode')
+    results = {}
+    for mode in ('wsgi', 'asgi'):
+        port = free_port()
+        server = subprocess.Popen(server_command(mode, port, args), cwd=BACKEND, env={**os.environ, **env})
+        try:
+            wait_for(port)
+            latencies, outcomes, elapsed = asyncio.run(load(f'http://127.0.0.1:{port}', paths, args))
+        finally:
+            server.terminate()
+            server.wait()
+        ok = len(latencies)
+        results[mode] = ok / elapsed
+        p50 = statistics.median(latencies) if latencies else 0
+        p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else p50
+        errors = {key: count for key, count in outcomes.items() if not (isinstance(key, int) and key < 300)}
+        label = 'gunicorn gthread (WSGI)' if mode == 'wsgi' else 'uvicorn (ASGI)'
+        print(f'{label:<24} {ok / elapsed:8.0f} req/s  p50={p50:7.1f}ms p99={p99:8.1f}ms  errors={errors}')
+
+    os.unlink(scratch.name)
+    print(f'ASGI/WSGI throughput: {results["asgi"] / results["wsgi"]:.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""Minimal in-memory Redis-protocol server for local development
+
+Implements the subset of commands the cache backend uses (PING, AUTH,
+SELECT, GET, SET with EX/PX/NX, DEL, INCR, MGET, SCAN, FLUSHDB, HMGET,
+HSET, EXPIRE) so several app workers can share a cache without installing
+Redis:
+
+    python tools/fake_redis.py --port 6390
+    CACHE_BACKEND=redis CACHE_URL=redis://127.0.0.1:6390/0 python app.py
+
+There is no Lua interpreter: EVAL runs a Python port of each script the
+app sends (SCRIPTS, keyed by the script's SHA1), and fails on any other.
+
+Can also be started in-process with FakeRedisServer(port=0).start().
+"""
+import argparse
+import fnmatch
+import hashlib
+import math
+import os
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class _Store:
+    def __init__(self):
+        self.data = {}  # key -> (value, expires_at or None)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry[0]
+
+def _take_token(store, keys, argv):
+    """ratelimit.TAKE_SCRIPT"""
+    rate, burst, now, ttl = float(argv[0]), float(argv[1]), float(argv[2]), int(argv[3])
+    bucket = store.get(keys[0]) or {}
+    tokens = burst
+    if b'tokens' in bucket:
+        tokens = min(burst, float(bucket[b'tokens']) + (now - float(bucket[b'updated_at'])) * rate)
+    allowed, retry_after = 0, math.ceil((1 - tokens) / rate * 1000)
+    if tokens >= 1:
+        allowed, retry_after, tokens = 1, 0, tokens - 1
+    store.data[keys[0]] = ({b'tokens': repr(tokens).encode(), b'updated_at': argv[2]}, time.monotonic() + ttl)
+    return [allowed, retry_after]
+
+def _scripts():
+    from ratelimit import TAKE_SCRIPT
+    return {hashlib.sha1(script.encode()).hexdigest(): port for script, port in [(TAKE_SCRIPT, _take_token)]}
+
+SCRIPTS = _scripts()
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            try:
+                reply = self.server.dispatch(args)
+            except Exception as e:  # reported to the client like Redis does
+                reply = RuntimeError(str(e))
+            self.wfile.write(_encode(reply))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.strip().split()  # inline command
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+def _encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Exception):
+        return b'-ERR %s\r\n' % str(reply).encode()
+    if isinstance(reply, bool):
+        return b':%d\r\n' % int(reply)
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(_encode(item) for item in reply)
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """Threaded RESP server backed by a dict"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=6390):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+        self.commands_processed = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        """Serve from a daemon thread; returns self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def dispatch(self, args):
+        command = args[0].decode().upper()
+        args = args[1:]
+        store = self.store
+        with store.lock:
+            self.commands_processed += 1
+            if command == 'PING':
+                return 'PONG'
+            if command in ('AUTH', 'SELECT'):
+                return 'OK'
+            if command == 'GET':
+                return store.get(args[0])
+            if command == 'MGET':
+                return [store.get(key) for key in args]
+            if command == 'SET':
+                key, value, options = args[0], args[1], [a.decode().upper() for a in args[2:]]
+                expires_at = None
+                if 'PX' in options:
+                    expires_at = time.monotonic() + int(options[options.index('PX') + 1]) / 1000
+                elif 'EX' in options:
+                    expires_at = time.monotonic() + int(options[options.index('EX') + 1])
+                if 'NX' in options and store.get(key) is not None:
+                    return None
+                store.data[key] = (value, expires_at)
+                return 'OK'
+            if command == 'DEL':
+                return sum(1 for key in args if store.data.pop(key, None) is not None)
+            if command == 'INCR':
+                value = int(store.get(args[0]) or 0) + 1
+                expires_at = store.data.get(args[0], (None, None))[1]
+                store.data[args[0]] = (str(value).encode(), expires_at)
+                return value
+            if command == 'SCAN':
+                options = [a.decode() for a in args[1:]]
+                pattern = options[options.index('MATCH') + 1] if 'MATCH' in options else '*'
+                keys = [key for key in list(store.data) if store.get(key) is not None
+                        and fnmatch.fnmatchcase(key.decode(), pattern)]
+                return [b'0', keys]
+            if command == 'HMGET':
+                fields = store.get(args[0]) or {}
+                return [fields.get(field) for field in args[1:]]
+            if command == 'HSET':
+                fields = store.get(args[0]) or {}
+                expires_at = store.data.get(args[0], (None, None))[1]
+                added = sum(1 for field in args[1::2] if field not in fields)
+                fields.update(zip(args[1::2], args[2::2]))
+                store.data[args[0]] = (fields, expires_at)
+                return added
+            if command == 'EXPIRE':
+                value = store.get(args[0])
+                if value is None:
+                    return 0
+                store.data[args[0]] = (value, time.monotonic() + int(args[1]))
+                return 1
+            if command == 'EVAL':
+                port = SCRIPTS.get(hashlib.sha1(args[0]).hexdigest())
+                if port is None:
+                    raise ValueError('fake_redis has no port of this script')
+                count = int(args[1])
+                return port(store, args[2:2 + count], args[2 + count:])
+            if command == 'FLUSHDB':
+                store.data.clear()
+                return 'OK'
+            raise ValueError(f"unknown command '{command}'")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+
+    server = FakeRedisServer(args.host, args.port)
+    print(f'Fake Redis listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
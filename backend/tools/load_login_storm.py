@@ -0,0 +1,137 @@
+"""Load test: flight search latency during a login storm
+
+Run from backend/:
+
+    python tools/load_login_storm.py
+    python tools/load_login_storm.py --threads 8 --login-rate 60 --search-rate 20 --duration 5
+
+Models one gthread-style worker: --threads request threads take requests
+from a shared queue in arrival order. Searches arrive at --search-rate per
+second, and in the storm phases logins arrive at --login-rate per second, far
+more than the CPU can hash. Search latency includes the time spent queued.
+
+Three phases run: searches alone, the storm with hashing on the request
+threads (PASSWORD_HASH_WORKERS=0, the old behaviour), and the storm with
+the bounded hashing pool from Config. The tool fails unless search p99
+under the pooled storm stays within --tolerance times the baseline (plus
+25ms of slack for timer noise).
+"""
+import argparse
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8, help='request threads in the worker')
+    parser.add_argument('--login-rate', type=float, default=60, help='logins per second during the storm')
+    parser.add_argument('--search-rate', type=float, default=20, help='searches per second')
+    parser.add_argument('--duration', type=float, default=5, help='seconds per phase')
+    parser.add_argument('--tolerance', type=float, default=3, help='allowed search p99 growth under the pooled storm')
+    parser.add_argument('--database-url', help='database (default: a temporary SQLite file)')
+    return parser.parse_args()
+
+def percentile(values, pct):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100)[pct - 1]
+
+def main():
+    args = parse_args()
+    scratch = None
+    if not args.database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        args.database_url = f'sqlite:///{scratch.name}'
+    os.environ['DATABASE_URL'] = args.database_url
+    os.environ['RATELIMIT_ENABLED'] = 'false'  # measure hashing, not the login rate limit
+
+    from app import create_app
+    from models import db, User
+    from inventory import seed_flights
+    from passwords import PasswordHasher
+
+    app = create_app('production')
+    departure_date = date.today() + timedelta(days=7)
+    email = f'storm-{time.time_ns()}@example.com'
+    with app.app_context():
+        seed_flights(days=14, flights_per_route=2)
+        user = User(email=email, name='Storm User')
+        user.password_hash = app.extensions['password_hasher'].hash('storm-password')
+        db.session.add(user)
+        db.session.commit()
+
+    search_url = f'/api/flights/search?origin=JFK&destination=LHR&date={departure_date.isoformat()}&passengers=1'
+    login = {'email': email, 'password': 'storm-password'}
+
+    def run_phase(label, login_rate):
+        jobs = queue.Queue()
+        latencies = {'search': [], 'login': []}
+        statuses = Counter()
+        lock = threading.Lock()
+
+        def serve():
+            client = app.test_client()
+            while True:
+                job = jobs.get()
+                if job is None:
+                    return
+                kind, queued_at = job
+                if kind == 'search':
+                    status = client.get(search_url).status_code
+                else:
+                    status = client.post('/api/auth/login', json=login).status_code
+                with lock:
+                    latencies[kind].append((time.perf_counter() - queued_at) * 1000)
+                    statuses[f'{kind} {status}'] += 1
+
+        arrivals = [(n / args.search_rate, 'search') for n in range(int(args.duration * args.search_rate))]
+        if login_rate:
+            arrivals += [(n / login_rate, 'login') for n in range(int(args.duration * login_rate))]
+        arrivals.sort()
+
+        threads = [threading.Thread(target=serve) for _ in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        began = time.perf_counter()
+        for offset, kind in arrivals:
+            delay = began + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            jobs.put((kind, time.perf_counter()))
+        for _ in threads:
+            jobs.put(None)
+        for thread in threads:
+            thread.join()
+
+        searches = latencies['search']
+        p50, p99 = statistics.median(searches), percentile(searches, 99)
+        print(f'{label:<28} search p50={p50:7.1f}ms p99={p99:7.1f}ms  {dict(sorted(statuses.items()))}')
+        return p99
+
+    print(f'{args.threads} request threads, {args.search_rate:g} searches/s, '
+          f'{args.login_rate:g} logins/s in the storm, {args.duration:g}s per phase')
+    pooled = app.extensions['password_hasher']
+    baseline = run_phase('searches only', 0)
+    app.extensions['password_hasher'] = PasswordHasher(method=pooled.method, workers=0)
+    inline = run_phase('storm, inline hashing', args.login_rate)
+    app.extensions['password_hasher'] = pooled
+    bounded = run_phase(f'storm, pool of {pooled.workers}+{pooled.max_queue}', args.login_rate)
+    print(f'search p99 vs baseline: inline {inline / baseline:.1f}x, pooled {bounded / baseline:.1f}x; '
+          f'hasher {pooled.stats()}')
+
+    if scratch:
+        os.unlink(scratch.name)
+    if bounded > baseline * args.tolerance + 25:
+        sys.exit('FAILED: search latency did not stay flat under the pooled login storm')
+    print('OK')
+
+if __name__ == '__main__':
+    main()
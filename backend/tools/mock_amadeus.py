@@ -0,0 +1,171 @@
+"""Local mock of the Amadeus flight offers API
+
+Serves the two endpoints the supplier client uses, with keep-alive
+connections, so the Amadeus integration can be exercised without
+credentials or network access:
+
+    python tools/mock_amadeus.py --port 8089 --latency 0.2
+    FLIGHT_SUPPLIER=amadeus AMADEUS_API_KEY=test AMADEUS_API_SECRET=test \
+        AMADEUS_BASE_URL=http://127.0.0.1:8089 python app.py
+
+Can also be started in-process with MockAmadeusServer(port=0).start();
+its counters (token_requests, offer_requests, connections) show whether
+tokens and connections are being reused.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CARRIERS = {'SW': 'SKYWINGS', 'AE': 'AEROELITE', 'PA': 'PACIFIC AIR', 'JS': 'JETSTREAM'}
+
+def build_offers(origin, destination, departure_date, adults, travel_class, count=6):
+    """Deterministic offers for a route and date"""
+    seed = int(hashlib.sha1(f'{origin}{destination}{departure_date}'.encode()).hexdigest(), 16)
+    offers = []
+    for i in range(count):
+        carrier = list(CARRIERS)[(seed >> i) % len(CARRIERS)]
+        dep_hour = 6 + i * 2
+        hours = 2 + (seed >> (i + 3)) % 7
+        stops = 1 if (seed >> (i + 5)) % 4 == 0 else 0
+        segments = [{
+            'departure': {'iataCode': origin, 'at': f'{departure_date}T{dep_hour:02d}:00:00'},
+            'arrival': {'iataCode': destination if not stops else 'FRA',
+                        'at': f'{departure_date}T{(dep_hour + hours) % 24:02d}:00:00'},
+            'carrierCode': carrier,
+            'number': str(100 + i),
+            'aircraft': {'code': '320'}
+        }]
+        if stops:
+            segments.append({
+                'departure': {'iataCode': 'FRA', 'at': f'{departure_date}T{(dep_hour + hours) % 24:02d}:45:00'},
+                'arrival': {'iataCode': destination, 'at': f'{departure_date}T{(dep_hour + hours + 2) % 24:02d}:45:00'},
+                'carrierCode': carrier,
+                'number': str(200 + i),
+                'aircraft': {'code': '359'}
+            })
+        price = (150 + (seed >> (i * 2)) % 400) * adults
+        price *= {'BUSINESS': 2.5, 'FIRST': 4.0}.get(travel_class, 1.0)
+        offers.append({
+            'type': 'flight-offer',
+            'id': str(i + 1),
+            'numberOfBookableSeats': 1 + (seed >> i) % 9,
+            'itineraries': [{'duration': f'PT{hours + 2 * stops}H', 'segments': segments}],
+            'price': {'currency': 'USD', 'total': f'{price:.2f}', 'grandTotal': f'{price:.2f}'}
+        })
+    return offers
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if urlparse(self.path).path != '/v1/security/oauth2/token':
+            return self._send_json(404, {'errors': [{'detail': 'Not found'}]})
+        if form.get('grant_type') != ['client_credentials'] or not form.get('client_id'):
+            return self._send_json(400, {'error': 'invalid_request'})
+
+        with self.server.lock:
+            self.server.token_requests += 1
+            token = f'mock-token-{self.server.token_requests}'
+            self.server.tokens.add(token)
+        self._send_json(200, {
+            'type': 'amadeusOAuth2Token',
+            'access_token': token,
+            'token_type': 'Bearer',
+            'expires_in': self.server.token_lifetime
+        })
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/v2/shopping/flight-offers':
+            return self._send_json(404, {'errors': [{'detail': 'Not found'}]})
+        token = self.headers.get('Authorization', '').removeprefix('Bearer ')
+        if token not in self.server.tokens:
+            return self._send_json(401, {'errors': [{'code': 38190, 'title': 'Invalid access token'}]})
+
+        with self.server.lock:
+            self.server.offer_requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        offers = build_offers(query['originLocationCode'], query['destinationLocationCode'],
+                              query['departureDate'], int(query.get('adults', 1)),
+                              query.get('travelClass', 'ECONOMY'))
+        if query.get('nonStop') == 'true':
+            offers = [o for o in offers if len(o['itineraries'][0]['segments']) == 1]
+        if 'maxPrice' in query:
+            offers = [o for o in offers if float(o['price']['total']) <= int(query['maxPrice'])]
+        self._send_json(200, {
+            'meta': {'count': len(offers)},
+            'data': offers[:int(query.get('max', 250))],
+            'dictionaries': {'carriers': CARRIERS}
+        })
+
+class MockAmadeusServer(ThreadingHTTPServer):
+    """Threaded HTTP server with request/connection counters"""
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=8089, latency=0.0, token_lifetime=1799):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.token_lifetime = token_lifetime
+        self.lock = threading.Lock()
+        self.tokens = set()
+        self.token_requests = 0
+        self.offer_requests = 0
+        self.connections = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve from a daemon thread; returns self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def revoke_tokens(self):
+        """Invalidate every issued token (clients must fetch a new one)"""
+        with self.lock:
+            self.tokens.clear()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to each offers request')
+    args = parser.parse_args()
+
+    server = MockAmadeusServer(args.host, args.port, latency=args.latency)
+    print(f'Mock Amadeus API listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
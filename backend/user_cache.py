@@ -0,0 +1,52 @@
+"""Cached user lookups for JWT-protected routes
+
+Flask-JWT-Extended calls the user lookup registered in create_app() once per
+request on every protected route and keeps the result for that request
+(flask_jwt_extended.current_user), which gives the request-scoped layer.
+Behind it, UserCache keeps a process-wide snapshot of each user for
+USER_CACHE_TTL seconds. An authenticated request therefore confirms the user
+exists without a database round trip.
+
+A snapshot is the user's to_dict() output (never the ORM object, which
+belongs to one session). update_profile() and change_password() invalidate
+it in the worker that handled them. Other workers pick the change up within
+the TTL.
+"""
+from sqlalchemy import select
+from cache import TTLCache
+from models import db, User, USER_FIELDS
+
+class UserCache:
+    """Short-TTL snapshots of users keyed by JWT identity"""
+
+    def __init__(self, ttl=30, maxsize=4096):
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl) if ttl > 0 else None
+        self.loads = 0
+
+    def _load(self, user_id):
+        self.loads += 1
+        row = db.session.execute(select(*USER_FIELDS.columns).where(User.id == user_id)).first()
+        return USER_FIELDS.dump_rows([row])[0] if row else None
+
+    def get(self, user_id):
+        """Snapshot dict of a user, or None if there is no such user"""
+        if self._cache is None:
+            return self._load(user_id)
+        key = str(user_id)
+        user = self._cache.get(key)
+        if user is None:
+            user = self._load(user_id)
+            if user is not None:
+                self._cache.set(key, user)
+        return user
+
+    def invalidate(self, user_id):
+        """Forget a user's snapshot after their row changed"""
+        if self._cache is not None:
+            self._cache.delete(str(user_id))
+
+    def stats(self):
+        stats = self._cache.stats() if self._cache is not None else {'ttl': 0}
+        stats['loads'] = self.loads
+        return stats
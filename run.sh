@@ -46,16 +46,57 @@ with app.app_context():
     print("Database initialized successfully!")
 EOF
 
+# Add indexes introduced since the database was created
+flask --app app create-indexes
+
+# Seed flight inventory (skipped if already seeded)
+echo "Seeding flight inventory..."
+flask --app app seed-flights
+
+# Server settings: SERVER is gunicorn (threaded WSGI workers), uvicorn
+# (ASGI, see asgi.py) or dev (Flask's debug server)
+SERVER=${SERVER:-gunicorn}
+HOST=${HOST:-0.0.0.0}
+PORT=${PORT:-5000}
+WEB_WORKERS=${WEB_WORKERS:-$(( $(nproc 2>/dev/null || echo 1) * 2 + 1 ))}
+WEB_THREADS=${WEB_THREADS:-8}
+
+# Several worker processes must share the cache (search invalidations,
+# Idempotency-Key records) and the rate-limit buckets; with the per-process
+# memory defaults each worker would keep its own copy
+if [ "$SERVER" != "dev" ] && [ "$WEB_WORKERS" -gt 1 ]; then
+    if [ "${CACHE_BACKEND:-memory}" = "memory" ]; then
+        export CACHE_BACKEND=sqlite
+        export CACHE_URL=${CACHE_URL:-$PWD/aerobook_cache.db}
+        echo "$WEB_WORKERS workers: sharing the sqlite cache at $CACHE_URL"
+    fi
+    if [ "${RATELIMIT_STORAGE:-memory}" = "memory" ]; then
+        export RATELIMIT_STORAGE=shared
+    fi
+fi
+
 # Start the server
 echo ""
 echo "======================================"
 echo "  Starting AeroBook Backend Server"
 echo "======================================"
 echo ""
-echo "Backend API: http://localhost:5000"
+echo "Backend API: http://localhost:$PORT ($SERVER)"
 echo "Frontend: Open frontend/index.html in your browser"
 echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-python3 app.py
+case "$SERVER" in
+    uvicorn)
+        ASGI_THREADS=$WEB_THREADS exec uvicorn asgi:app --host "$HOST" --port "$PORT" \
+            --workers "$WEB_WORKERS" --no-access-log
+        ;;
+    dev)
+        exec python3 app.py
+        ;;
+    *)
+        exec gunicorn "app:create_app('production')" --bind "$HOST:$PORT" \
+            --workers "$WEB_WORKERS" --worker-class gthread --threads "$WEB_THREADS"
+        ;;
+esac